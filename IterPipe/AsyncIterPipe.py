@@ -0,0 +1,447 @@
+from collections import deque
+from collections.abc import AsyncIterator
+import asyncio
+import operator
+
+from .IterPipe import Stage
+
+
+_missing = object()
+
+
+async def _from_iterable(iterable):
+    for item in iterable:
+        yield item
+
+
+def _aiter(iterable):
+    if hasattr(iterable, "__aiter__"):
+        return iterable.__aiter__()
+    return _from_iterable(iterable)
+
+
+async def _aclose(iterator):
+    """
+    Close an upstream async iterator that will not be read to the end, so its pending work is cancelled.
+    """
+    aclose = getattr(iterator, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+async def _build_accumulate(iterator, func, initial):
+    total = initial
+    if total is _missing:
+        async for total in iterator:
+            yield total
+            break
+        else:
+            return
+    else:
+        yield total
+    async for item in iterator:
+        total = func(total, item)
+        yield total
+
+
+async def _build_batch(iterator, size, container):
+    if size < 1:
+        raise ValueError("batch size must be at least 1")
+    batch = []
+    async for item in iterator:
+        batch.append(item)
+        if len(batch) >= size:
+            yield container(batch)
+            batch = []
+    if batch:
+        yield container(batch)
+
+
+async def _build_chain(iterator, iterables):
+    async for item in iterator:
+        yield item
+    for iterable in iterables:
+        async for item in _aiter(iterable):
+            yield item
+
+
+async def _build_dropwhile(iterator, predicate):
+    async for item in iterator:
+        if not predicate(item):
+            yield item
+            break
+    async for item in iterator:
+        yield item
+
+
+async def _build_enumerate(iterator, start):
+    count = start
+    async for item in iterator:
+        yield count, item
+        count += 1
+
+
+async def _build_filter(iterator, function):
+    if function is None:
+        function = bool
+    async for item in iterator:
+        if function(item):
+            yield item
+
+
+async def _build_filterfalse(iterator, predicate):
+    if predicate is None:
+        predicate = bool
+    async for item in iterator:
+        if not predicate(item):
+            yield item
+
+
+async def _build_islice(iterator, args):
+    bounds = slice(*args)
+    start, stop, step = bounds.start or 0, bounds.stop, bounds.step or 1
+    try:
+        if stop is not None and stop <= start:
+            return
+        index = 0
+        async for item in iterator:
+            if index >= start and (index - start) % step == 0:
+                yield item
+            index += 1
+            if stop is not None and index >= stop:
+                return
+    finally:
+        await _aclose(iterator)
+
+
+async def _build_map(iterator, function):
+    async for item in iterator:
+        yield function(item)
+
+
+async def _build_map_async(iterator, function, concurrency, ordered):
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    pending = deque() if ordered else set()
+    submit = pending.append if ordered else pending.add
+    try:
+        async for item in iterator:
+            submit(asyncio.ensure_future(function(item)))
+            while len(pending) >= concurrency:
+                if ordered:
+                    yield await pending.popleft()
+                else:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    pending.difference_update(done)
+                    for task in done:
+                        yield task.result()
+        while pending:
+            if ordered:
+                yield await pending.popleft()
+            else:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending.difference_update(done)
+                for task in done:
+                    yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _build_starmap(iterator, function):
+    async for item in iterator:
+        yield function(*item)
+
+
+async def _build_takewhile(iterator, predicate):
+    try:
+        async for item in iterator:
+            if not predicate(item):
+                return
+            yield item
+    finally:
+        await _aclose(iterator)
+
+
+async def _build_unbatch(iterator):
+    async for batch in iterator:
+        for item in batch:
+            yield item
+
+
+async def _build_zip(iterator, iterables):
+    others = [_aiter(iterable) for iterable in iterables]
+    try:
+        async for item in iterator:
+            items = [item]
+            for other in others:
+                try:
+                    items.append(await other.__anext__())
+                except StopAsyncIteration:
+                    return
+            yield tuple(items)
+    finally:
+        for other in [iterator] + others:
+            await _aclose(other)
+
+
+class AsyncIterPipe(AsyncIterator):
+    """
+    Asynchronous iterator pipeline over an async iterable (or a plain iterable).
+
+    Mirrors the IterPipe API: chained methods record stages lazily and terminals are coroutines, e.g.
+    ``await AsyncIterPipe(source).map_async(fetch, concurrency=10).list()``.
+    """
+
+    def __init__(self, iterator):
+        if isinstance(iterator, AsyncIterPipe) and iterator._iterator is None:
+            self._source = iterator._source
+            self._stages = iterator._stages
+        else:
+            self._source = iterator
+            self._stages = ()
+        self._iterator = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._run().__anext__()
+
+    @property
+    def stages(self):
+        """
+        Stages recorded in the pipeline plan, in execution order.
+
+        :rtype: tuple
+        """
+        return self._stages
+
+    def _run(self):
+        """
+        Build the plan into a chain of async iterators, once, and return the outermost one.
+        """
+        iterator = self._iterator
+        if iterator is None:
+            iterator = _aiter(self._source)
+            for stage in self._stages:
+                iterator = stage.build(iterator, *stage.args)
+            self._iterator = iterator
+        return iterator
+
+    def _then(self, name, build, *args):
+        """
+        Return a new AsyncIterPipe with one more stage recorded in its plan.
+        """
+        pipe = AsyncIterPipe.__new__(AsyncIterPipe)
+        if self._iterator is None:
+            pipe._source = self._source
+            pipe._stages = self._stages + (Stage(name, build, args),)
+        else:
+            pipe._source = self._iterator
+            pipe._stages = (Stage(name, build, args),)
+        pipe._iterator = None
+        return pipe
+
+    def accumulate(self, func=operator.add, initial=_missing):
+        """
+        Return running accumulation, like itertools.accumulate.
+
+        :rtype: AsyncIterPipe
+        """
+        return self._then("accumulate", _build_accumulate, func, initial)
+
+    async def all(self):
+        """
+        :rtype: bool
+        """
+        iterator = self._run()
+        async for item in iterator:
+            if not item:
+                await _aclose(iterator)
+                return False
+        return True
+
+    async def any(self):
+        """
+        :rtype: bool
+        """
+        iterator = self._run()
+        async for item in iterator:
+            if item:
+                await _aclose(iterator)
+                return True
+        return False
+
+    def batch(self, size, container=list):
+        """
+        Group items into batches of the given size. The last batch may be shorter.
+
+        :rtype: AsyncIterPipe
+        """
+        return self._then("batch", _build_batch, size, container)
+
+    def chain(self, *iterables):
+        """
+        Chain given iterables, sync or async, to the end of the pipeline.
+
+        :rtype: AsyncIterPipe
+        """
+        return self._then("chain", _build_chain, iterables)
+
+    async def dict(self, **kwarg):
+        """
+        :rtype: dict
+        """
+        return dict(await self.list(), **kwarg)
+
+    def dropwhile(self, predicate):
+        """
+        :rtype: AsyncIterPipe
+        """
+        return self._then("dropwhile", _build_dropwhile, predicate)
+
+    def enumerate(self, start=0):
+        """
+        :rtype: AsyncIterPipe
+        """
+        return self._then("enumerate", _build_enumerate, start)
+
+    def filter(self, function):
+        """
+        :rtype: AsyncIterPipe
+        """
+        return self._then("filter", _build_filter, function)
+
+    def filterfalse(self, predicate):
+        """
+        :rtype: AsyncIterPipe
+        """
+        return self._then("filterfalse", _build_filterfalse, predicate)
+
+    async def frozenset(self):
+        """
+        :rtype: frozenset
+        """
+        return frozenset(await self.list())
+
+    def islice(self, *args):
+        """
+        Select items like itertools.islice(iterable, [start,] stop [, step]).
+
+        :rtype: AsyncIterPipe
+        """
+        return self._then("islice", _build_islice, args)
+
+    async def list(self):
+        """
+        :rtype: list
+        """
+        return [item async for item in self._run()]
+
+    def map(self, function):
+        """
+        Apply the given synchronous function to each item.
+
+        :rtype: AsyncIterPipe
+        """
+        return self._then("map", _build_map, function)
+
+    def map_async(self, function, concurrency=1, ordered=True):
+        """
+        Apply the given coroutine function to each item, keeping up to concurrency coroutines in flight.
+
+        :param ordered: Yield results in input order if true, otherwise as soon as they complete.
+        :rtype: AsyncIterPipe
+        """
+        return self._then("map_async", _build_map_async, function, concurrency, ordered)
+
+    async def _best(self, better, key, default, name):
+        """
+        Return the first item whose key is better than that of every item before it, like the builtin min and max.
+        """
+        best = value = _missing
+        async for item in self._run():
+            candidate = item if key is None else key(item)
+            if value is _missing or better(candidate, best):
+                best = candidate
+                value = item
+        if value is _missing:
+            if default is _missing:
+                raise ValueError("{name}() arg is an empty sequence".format(name=name))
+            return default
+        return value
+
+    async def max(self, key=None, default=_missing):
+        """
+        Return the biggest item, streaming. key and default work as for the builtin max.
+        """
+        return await self._best(operator.gt, key, default, "max")
+
+    async def min(self, key=None, default=_missing):
+        """
+        Return the smallest item, streaming. key and default work as for the builtin min.
+        """
+        return await self._best(operator.lt, key, default, "min")
+
+    async def next(self):
+        """
+        Return the next item from the iterator.
+        """
+        return await self.__anext__()
+
+    async def reduce(self, function, initializer=None):
+        """
+        Apply a function of two arguments cumulatively to the items, from left to right.
+        """
+        value = initializer
+        async for item in self._run():
+            value = function(value, item)
+        return value
+
+    async def set(self):
+        """
+        :rtype: set
+        """
+        return {item async for item in self._run()}
+
+    def starmap(self, function):
+        """
+        :rtype: AsyncIterPipe
+        """
+        return self._then("starmap", _build_starmap, function)
+
+    async def sum(self, start=0):
+        """
+        Return the sum of a 'start' value (default: 0) plus the items.
+        """
+        total = start
+        async for item in self._run():
+            total = total + item
+        return total
+
+    def takewhile(self, predicate):
+        """
+        :rtype: AsyncIterPipe
+        """
+        return self._then("takewhile", _build_takewhile, predicate)
+
+    async def tuple(self):
+        """
+        :rtype: tuple
+        """
+        return tuple(await self.list())
+
+    def unbatch(self):
+        """
+        :rtype: AsyncIterPipe
+        """
+        return self._then("unbatch", _build_unbatch)
+
+    def zip(self, *iterables):
+        """
+        Zip the pipeline with the given iterables, sync or async.
+
+        :rtype: AsyncIterPipe
+        """
+        return self._then("zip", _build_zip, iterables)
@@ -1,18 +1,336 @@
+from collections import deque, namedtuple
 from collections.abc import Iterator
 import itertools
 import functools
+import heapq
 import operator
+import time
 
+from . import plugins
+
+# Stage families are imported on first use, so that importing IterPipe stays cheap. See IterPipe.plugins.
+caching = plugins.LazyModule("caching", globals())
+_checkpoint = plugins.LazyModule("checkpoint", globals(), "_checkpoint")
+dedup = plugins.LazyModule("dedup", globals())
+fanout = plugins.LazyModule("fanout", globals())
+files = plugins.LazyModule("files", globals())
+flow = plugins.LazyModule("flow", globals())
+grouping = plugins.LazyModule("grouping", globals())
+joins = plugins.LazyModule("joins", globals())
+optimizer = plugins.LazyModule("optimizer", globals())
+parallel = plugins.LazyModule("parallel", globals())
+profiling = plugins.LazyModule("profiling", globals())
+_reducers = plugins.LazyModule("reducers", globals(), "_reducers")
+shuffle = plugins.LazyModule("shuffle", globals())
+sorting = plugins.LazyModule("sorting", globals())
+templates = plugins.LazyModule("templates", globals())
+_vectorized = plugins.LazyModule("vectorized", globals(), "_vectorized")
+windows = plugins.LazyModule("windows", globals())
+
+
+# A single recorded step of a pipeline plan. ``build`` receives the upstream iterator followed by ``args`` and returns
+# the downstream iterator.
+Stage = namedtuple("Stage", ["name", "build", "args"])
+
+# Stage._make without the Python-level call, as a stage is recorded for every chained method.
+_new_stage = functools.partial(tuple.__new__, Stage)
+
+
+def _build_accumulate(iterator, func):
+    return itertools.accumulate(iterator, func)
+
+
+def _build_batch(iterator, size, timeout, container):
+    if size < 1:
+        raise ValueError("batch size must be at least 1")
+    if timeout is None:
+        return iter(lambda: container(itertools.islice(iterator, size)), container())
+    return _timed_batches(iterator, size, timeout, container)
+
+
+def _timed_batches(iterator, size, timeout, container):
+    # The timeout is checked as items arrive; a blocking upstream next() cannot be interrupted.
+    clock = time.monotonic
+    batch = []
+    deadline = None
+    for item in iterator:
+        if not batch:
+            deadline = clock() + timeout
+        batch.append(item)
+        if len(batch) >= size or clock() >= deadline:
+            yield container(batch)
+            batch = []
+    if batch:
+        yield container(batch)
+
+
+def _build_cached_map(iterator, function, key, cache):
+    return map(cache.wrap(function, key), iterator)
+
+
+def _build_chain(iterator, iterables):
+    return itertools.chain(iterator, *iterables)
+
+
+def _build_combinations(iterator, r):
+    return itertools.combinations(iterator, r)
+
+
+def _build_combinations_with_replacement(iterator, r):
+    return itertools.combinations_with_replacement(iterator, r)
+
+
+def _build_compress(iterator, selectors):
+    return itertools.compress(iterator, selectors)
+
+
+def _build_dropwhile(iterator, predicate):
+    return itertools.dropwhile(predicate, iterator)
+
+
+def _build_enumerate(iterator, kwarg):
+    return enumerate(iterator, **kwarg)
+
+
+def _build_filter(iterator, function):
+    return filter(function, iterator)
+
+
+def _build_filterfalse(iterator, predicate):
+    return itertools.filterfalse(predicate, iterator)
+
+
+def _build_groupby(iterator, key):
+    return itertools.groupby(iterator, key)
+
+
+def _build_islice(iterator, args, kwargs):
+    return itertools.islice(iterator, *args, **kwargs)
+
+
+def _build_map_batches(iterator, function, size):
+    return itertools.chain.from_iterable(map(function, _build_batch(iterator, size, None, list)))
+
+
+def _build_join(iterator, other, left_key, right_key, how, build, max_memory_items, tmp_dir):
+    return joins.hash_join(iterator, other, left_key, right_key, how, build, max_memory_items, tmp_dir)
+
+
+def _build_merge_join(iterator, other, left_key, right_key, how):
+    return joins.merge_join(iterator, other, left_key, right_key, how)
+
+
+def _build_map(iterator, function):
+    return map(function, iterator)
+
+
+def _build_parallel(iterator, chunk_function, function, workers, chunksize, ordered, executor, transport):
+    return parallel.imap_chunks(iterator, chunk_function, function, workers, chunksize, ordered, executor, transport)
+
+
+def _build_partition_by(iterator, key, n):
+    # Only marks where gather splits the plan; see IterPipe.gather.
+    return iterator
+
+
+def _build_permutations(iterator, r):
+    return itertools.permutations(iterator, r=r)
+
+
+def _build_product(iterator, iterables, repeat):
+    return itertools.product(iterator, *iterables, repeat=repeat)
+
+
+def _build_sorted(iterator, key, reverse):
+    return iter(sorted(iterator, key=key, reverse=reverse))
+
+
+def _build_starmap(iterator, function):
+    return itertools.starmap(function, iterator)
+
+
+def _build_takewhile(iterator, predicate):
+    return itertools.takewhile(predicate, iterator)
+
+
+def _build_unbatch(iterator):
+    return itertools.chain.from_iterable(iterator)
+
+
+def _build_vectorized(iterator, block_size):
+    # Only takes effect as the first stage of a plan; see IterPipe._run.
+    return iterator
+
+
+def _build_zip(iterator, iterables):
+    return zip(iterator, *iterables)
+
+
+def _build_zip_longest(iterator, iterables, fillvalue):
+    return itertools.zip_longest(iterator, *iterables, fillvalue=fillvalue)
+
+
+class IterPipe:
+    """
+    Iterator pipeline.
+
+    Chained methods do not wrap the pipeline in another iterator. They record a stage in a lazy plan, which is built
+    into a single chain of native iterators the first time an item is requested, either through ``__next__`` or
+    through a terminal such as ``list`` or ``sum``. Per-element cost therefore does not include a Python-level hop
+    per stage. Iterating a pipeline with ``for`` or ``iter()`` hands out the built chain itself, so loops over a
+    pipeline run at the speed of the native iterators.
+    """
+
+    __slots__ = ("_source", "_stages", "_iterator", "_instrument", "_checkpoint", "_probes")
 
-class IterPipe(Iterator):
     def __init__(self, iterator):
-        self.iterator = iter(iterator)
+        if isinstance(iterator, IterPipe) and iterator._iterator is None:
+            # Take over the plan of an unstarted pipeline instead of wrapping it.
+            self._source = iterator._source
+            self._stages = iterator._stages
+            self._instrument = iterator._instrument
+            self._checkpoint = iterator._checkpoint
+        else:
+            self._source = iterator
+            self._stages = ()
+            self._instrument = None
+            self._checkpoint = None
+        self._iterator = None
+        self._probes = None
 
     def __iter__(self):
-        return self
+        # The built chain shares its position with this pipeline, so it can be iterated in place of it.
+        return self._run()
 
     def __next__(self):
-        return self.iterator.__next__()
+        iterator = self._iterator
+        if iterator is None:
+            iterator = self._run()
+        return next(iterator)
+
+    @classmethod
+    def from_lines(cls, path, encoding="utf-8", errors="strict"):
+        """
+        Pipeline over the lines of a memory-mapped file, without line endings, decoded lazily with encoding.
+
+        Lines are bytes if encoding is None.
+        :rtype: IterPipe
+        """
+        return cls(files.from_lines(path, encoding, errors))
+
+    @classmethod
+    def from_mmap(cls, path, sep=b"\n"):
+        """
+        Pipeline over zero-copy memoryview slices of a memory-mapped file, split on sep.
+
+        The file stays mapped until the last slice is released.
+        :rtype: IterPipe
+        """
+        return cls(files.from_mmap(path, sep))
+
+    @classmethod
+    def from_records(cls, path, struct_fmt):
+        """
+        Pipeline over tuples unpacked from the fixed-size records of a memory-mapped file.
+
+        See https://docs.python.org/3/library/struct.html#struct.iter_unpack
+        :rtype: IterPipe
+        """
+        return cls(files.from_records(path, struct_fmt))
+
+    @classmethod
+    def template(cls):
+        """
+        Start a reusable pipeline plan without a source.
+
+        Chain methods on the template as on a pipeline, optionally ending with a terminal such as sum or list. The
+        plan is recorded once; calling the template with a source runs it over that source without recording the
+        stages again, e.g. ``sum_even = IterPipe.template().filter(is_even).sum()`` then ``sum_even(items)``. Reducer
+        instances given to the terminal, such as to aggregate, are copied for each run.
+
+        :rtype: IterPipe.templates.Template
+        """
+        return templates.Template(cls(templates.PLACEHOLDER))
+
+    @property
+    def stages(self):
+        """
+        Stages recorded in the pipeline plan, in execution order.
+
+        :rtype: tuple
+        """
+        return self._stages
+
+    def _run(self):
+        """
+        Build the plan into a chain of iterators, once, and return the outermost one.
+        """
+        iterator = self._iterator
+        if iterator is None:
+            stages = self._stages
+            if self._checkpoint is not None:
+                if self._instrument is not None:
+                    raise ValueError("a pipeline cannot be both instrumented and checkpointed")
+                iterator = self._iterator = _checkpoint.build(self._source, stages, *self._checkpoint)
+                return iterator
+            if self._instrument is not None:
+                iterator, self._probes = profiling.build(self._source, stages, *self._instrument)
+                self._iterator = iterator
+                return iterator
+            blocks = None
+            if stages and stages[0].build is _build_vectorized:
+                blocks, stages = _vectorized.blocks(self._source, stages)
+            iterator = iter(self._source) if blocks is None else _vectorized.unbox(blocks)
+            for stage in stages:
+                iterator = stage.build(iterator, *stage.args)
+            self._iterator = iterator
+        return iterator
+
+    def _blocks(self):
+        """
+        Return an iterator of NumPy blocks if the whole plan runs vectorized, otherwise None.
+        """
+        if (self._iterator is None and self._instrument is None and self._checkpoint is None and self._stages
+                and self._stages[0].build is _build_vectorized):
+            blocks, stages = _vectorized.blocks(self._source, self._stages)
+            if blocks is not None and not stages:
+                self._iterator = iter(())
+                return blocks
+        return None
+
+    def _then(self, name, build, *args):
+        """
+        Return a new IterPipe with one more stage recorded in its plan.
+        """
+        pipe = IterPipe.__new__(IterPipe)
+        if self._iterator is None:
+            pipe._source = self._source
+            pipe._stages = self._stages + (_new_stage((name, build, args)),)
+            pipe._instrument = self._instrument
+            pipe._checkpoint = self._checkpoint
+        else:
+            # Already running: continue from the live iterator so no items are replayed. Its checkpointing or
+            # instrumentation already wraps the stages before it and must not be built a second time.
+            pipe._source = self._iterator
+            pipe._stages = (_new_stage((name, build, args)),)
+            pipe._instrument = None
+            pipe._checkpoint = None
+        pipe._iterator = None
+        pipe._probes = None
+        return pipe
+
+    def _with_source(self, source):
+        """
+        Return a new unstarted IterPipe running the plan of this one over source.
+        """
+        pipe = IterPipe.__new__(IterPipe)
+        pipe._source = source
+        pipe._stages = self._stages
+        pipe._iterator = None
+        pipe._instrument = self._instrument
+        pipe._checkpoint = self._checkpoint
+        pipe._probes = None
+        return pipe
 
     def accumulate(self, func=operator.add):
         """
@@ -24,7 +342,40 @@ class IterPipe(Iterator):
         :type: callable
         :rtype: IterPipe
         """
-        return IterPipe(itertools.accumulate(self, func))
+        return self._then("accumulate", _build_accumulate, func)
+
+    def aggregate(self, **reducers):
+        """
+        Compute any number of named aggregates in a single pass and return them as a dict.
+
+        Each reducer is an object with update(item) and result() methods, or a class creating one, such as those in
+        IterPipe.reducers, e.g. ``pipe.aggregate(count=Count, total=Sum, lo=Min, hi=Max)``.
+        :rtype: dict
+        """
+        reducers = {name: reducer() if isinstance(reducer, type) else reducer for name, reducer in reducers.items()}
+        updates = [reducer.update for reducer in reducers.values()]
+        if len(updates) == 1:
+            deque(map(updates[0], self._run()), maxlen=0)
+        else:
+            for item in self._run():
+                for update in updates:
+                    update(item)
+        return {name: reducer.result() for name, reducer in reducers.items()}
+
+    def aggregate_by(self, key, init, step, merge=None, max_keys=None, tmp_dir=None):
+        """
+        Aggregate items per key in a single pass, without requiring sorted input, and yield (key, aggregate) pairs.
+
+        Memory is proportional to the number of distinct keys. When max_keys is given, partial aggregates are spilled
+        to temporary files in tmp_dir once more than max_keys keys are held, and merged at the end.
+
+        :param key: Function returning the key of an item. The item itself is used if None.
+        :param init: Zero-argument function returning a new aggregate, e.g. int or list.
+        :param step: Function (aggregate, item) returning the updated aggregate.
+        :param merge: Function (aggregate, aggregate) combining two partial aggregates. Required to spill.
+        :rtype: IterPipe
+        """
+        return self._then("aggregate_by", grouping.aggregate_by, key, init, step, merge, max_keys, tmp_dir)
 
     def all(self):
         """
@@ -32,7 +383,7 @@ class IterPipe(Iterator):
 
         :rtype: bool
         """
-        return all(self)
+        return all(self._run())
 
     def any(self):
         """
@@ -40,7 +391,51 @@ class IterPipe(Iterator):
 
         :rtype: bool
         """
-        return any(self)
+        return any(self._run())
+
+    def batch(self, size, timeout=None, container=list):
+        """
+        Group items into batches of the given size. The last batch may be shorter.
+
+        :param size: Maximum number of items per batch.
+        :param timeout: If given, also emit a batch once this many seconds have passed since its first item arrived.
+            The check is made as each item arrives, so a blocking upstream is not interrupted.
+        :param container: Type of the batches, e.g. list or tuple.
+        :rtype: IterPipe
+        """
+        return self._then("batch", _build_batch, size, timeout, container)
+
+    def broadcast(self, *functions, max_buffer=None):
+        """
+        Drive one pass over the pipeline into several sub-pipelines and return a tuple of their results.
+
+        Each function receives its own IterPipe branch and runs in its own thread, e.g.
+        ``pipe.broadcast(lambda p: p.sum(), lambda p: p.count_by().dict())``. The branches advance in lockstep: at most
+        max_buffer items are held between the slowest and the fastest one. The first exception raised by a function
+        is re-raised. A branch is closed when its function returns, so functions must consume it rather than return
+        a lazy pipeline over it; reading a closed branch raises ValueError.
+
+        :param max_buffer: Defaults to IterPipe.fanout.DEFAULT_MAX_BUFFER.
+        :rtype: tuple
+        """
+        if max_buffer is None:
+            max_buffer = fanout.DEFAULT_MAX_BUFFER
+        return fanout.broadcast(self._run(), functions, max_buffer, IterPipe)
+
+    def cached_map(self, function, key=None, maxsize=128, ttl=None, policy="lru", cache=None):
+        """
+        Like map, but memoize function(item) in a cache with LRU or LFU eviction and an optional time-to-live.
+
+        Pass a Cache as cache to share it between pipelines or to read its hit, miss and eviction statistics with
+        Cache.info(); maxsize, ttl and policy are then taken from that cache. Use Cache(thread_safe=True) when the
+        cache is also used from other threads.
+
+        :param key: Function returning the cache key of an item. The item itself is used if None.
+        :rtype: IterPipe
+        """
+        if cache is None:
+            cache = caching.Cache(maxsize=maxsize, ttl=ttl, policy=policy)
+        return self._then("cached_map", _build_cached_map, function, key, cache)
 
     def chain(self, *iterables):
         """
@@ -50,7 +445,25 @@ class IterPipe(Iterator):
 
         :rtype: IterPipe
         """
-        return IterPipe(itertools.chain(self, *iterables))
+        return self._then("chain", _build_chain, iterables)
+
+    def checkpoint(self, store, every=1000):
+        """
+        Save a snapshot of the pipeline position to store every `every` items, and when the pipeline is exhausted.
+
+        A snapshot holds the number of items taken from the source and emitted, and the state of the enumerate,
+        accumulate, islice, dropwhile and takewhile stages; map, filter, filterfalse, starmap and cached_map are
+        stateless. Other stages cannot be checkpointed. An item counts as processed once the next one is requested.
+        Continue an interrupted run with resume on a pipeline with the same plan.
+
+        :param store: Object with save(checkpoint) and load() methods, such as IterPipe.checkpoint.FileCheckpointStore.
+        :rtype: IterPipe
+        """
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        pipe = IterPipe(self)
+        pipe._checkpoint = (store, every, None)
+        return pipe
 
     def combinations(self, r: int):
         """
@@ -60,7 +473,7 @@ class IterPipe(Iterator):
 
         :rtype: IterPipe
         """
-        return IterPipe(itertools.combinations(self, r))
+        return self._then("combinations", _build_combinations, r)
 
     def combinations_with_replacement(self, r: int):
         """
@@ -70,7 +483,7 @@ class IterPipe(Iterator):
 
         :rtype: IterPipe
         """
-        return IterPipe(itertools.combinations_with_replacement(self, r))
+        return self._then("combinations_with_replacement", _build_combinations_with_replacement, r)
 
     def compress(self, selectors):
         """
@@ -79,7 +492,24 @@ class IterPipe(Iterator):
         See https://docs.python.org/3.7/library/itertools.html#itertools.compress
         :rtype: IterPipe
         """
-        return IterPipe(itertools.compress(self, selectors))
+        return self._then("compress", _build_compress, selectors)
+
+    def count_distinct(self, precision=14):
+        """
+        Return the approximate number of distinct items, using a HyperLogLog sketch of 2 ** precision bytes.
+
+        See IterPipe.reducers.Distinct
+        :rtype: int
+        """
+        return self.aggregate(distinct=_reducers.Distinct(precision))["distinct"]
+
+    def count_by(self, key=None, max_keys=None, tmp_dir=None):
+        """
+        Yield (key, number of items) pairs. See aggregate_by.
+
+        :rtype: IterPipe
+        """
+        return self._then("count_by", grouping.count_by, key, max_keys, tmp_dir)
 
     def cycle(self):
         """
@@ -88,7 +518,7 @@ class IterPipe(Iterator):
         See https://docs.python.org/3.7/library/itertools.html#itertools.cycle
         :rtype: IterPipe
         """
-        return IterPipe(itertools.cycle(self))
+        return self._then("cycle", itertools.cycle)
 
     def dict(self, **kwarg):
         """
@@ -99,7 +529,18 @@ class IterPipe(Iterator):
         See https://docs.python.org/3/library/functions.html#func-dict
         :rtype: dict
         """
-        return dict(self, **kwarg)
+        return dict(self._run(), **kwarg)
+
+    def distinct(self, key=None, mode="exact", capacity=None, error_rate=0.01):
+        """
+        Return the first occurrence of each item, or of each key(item), lazily.
+
+        :param mode: 'exact' remembers every key in a set. 'bloom' uses a Bloom filter sized for capacity keys, so
+            memory is fixed but about error_rate of the new keys are wrongly dropped as duplicates (more once capacity
+            is exceeded). 'window' only remembers keys seen within the last capacity items.
+        :rtype: IterPipe
+        """
+        return self._then("distinct", dedup.distinct, key, mode, capacity, error_rate)
 
     def dropwhile(self, predicate):
         """
@@ -108,7 +549,7 @@ class IterPipe(Iterator):
         See https://docs.python.org/3.7/library/itertools.html#itertools.dropwhile
         :rtype: IterPipe
         """
-        return IterPipe(itertools.dropwhile(predicate, self))
+        return self._then("dropwhile", _build_dropwhile, predicate)
 
     def enumerate(self, **kwarg):
         """
@@ -117,7 +558,31 @@ class IterPipe(Iterator):
         See https://docs.python.org/3/library/functions.html#enumerate
         :rtype: IterPipe
         """
-        return IterPipe(enumerate(self, **kwarg))
+        return self._then("enumerate", _build_enumerate, kwarg)
+
+    def explain(self):
+        """
+        Describe the plan that optimize would produce, one stage per line, followed by the rewrites it applies.
+
+        :rtype: str
+        """
+        stages, rewrites = optimizer.optimize(self._stages)
+        return optimizer.explain(self._source, stages, rewrites)
+
+    def external_sorted(self, key=None, reverse=False, max_memory_items=None, tmp_dir=None):
+        """
+        Like sorted, but hold at most max_memory_items items in memory.
+
+        Sorted runs are written to temporary files in tmp_dir and merged lazily, so the first item is available
+        without loading the whole input. Items must be picklable once the input exceeds max_memory_items.
+
+        See https://docs.python.org/3/library/heapq.html#heapq.merge
+        :param max_memory_items: Defaults to IterPipe.sorting.DEFAULT_MAX_MEMORY_ITEMS.
+        :rtype: IterPipe
+        """
+        if max_memory_items is None:
+            max_memory_items = sorting.DEFAULT_MAX_MEMORY_ITEMS
+        return self._then("external_sorted", sorting.external_sorted, key, reverse, max_memory_items, tmp_dir)
 
     def filterfalse(self, predicate: callable):
         """
@@ -126,7 +591,7 @@ class IterPipe(Iterator):
         See https://docs.python.org/3.7/library/itertools.html#itertools.filterfalse
         :rtype: IterPipe
         """
-        return IterPipe(itertools.filterfalse(predicate, self))
+        return self._then("filterfalse", _build_filterfalse, predicate)
 
     def frozenset(self):
         """
@@ -135,7 +600,7 @@ class IterPipe(Iterator):
         See https://docs.python.org/3/library/functions.html#func-frozenset
         :rtype: frozenset
         """
-        return frozenset(self)
+        return frozenset(self._run())
 
     def filter(self, function: callable):
         """
@@ -143,7 +608,26 @@ class IterPipe(Iterator):
 
         :return:
         """
-        return IterPipe(filter(function, self))
+        return self._then("filter", _build_filter, function)
+
+    def gather(self, ordered=False):
+        """
+        Run the stages chained since the last partition_by on its worker processes and merge their outputs.
+
+        :param ordered: Yield the whole output of partition 0, then of partition 1 and so on, holding back the output
+            of later partitions in memory. Otherwise yield outputs as soon as workers produce them.
+        :rtype: IterPipe
+        """
+        stages = () if self._iterator is not None else self._stages
+        for index in range(len(stages) - 1, -1, -1):
+            if stages[index].build is _build_partition_by:
+                break
+        else:
+            raise ValueError("gather() needs an unstarted pipeline with partition_by() in its plan")
+        pipe = self._with_source(self._source)
+        pipe._stages = stages[:index]
+        key, n = stages[index].args
+        return pipe._then("gather", shuffle.gather, key, n, stages[index + 1:], ordered)
 
     def groupby(self, key=None):
         """
@@ -152,7 +636,22 @@ class IterPipe(Iterator):
         See https://docs.python.org/3/library/itertools.html#itertools.groupby
         :rtype: IterPipe
         """
-        return IterPipe(itertools.groupby(self, key))
+        return self._then("groupby", _build_groupby, key)
+
+    def instrument(self, callback=None):
+        """
+        Record per-stage item counts and timings when the pipeline runs. See report.
+
+        Stages chained after this call are instrumented as well. Instrumentation only adds work when it is enabled;
+        a pipeline that is not instrumented runs exactly as before. The vectorized stage has no effect on an
+        instrumented pipeline.
+
+        :param callback: Called with the report when the pipeline is exhausted, e.g. to export metrics.
+        :rtype: IterPipe
+        """
+        pipe = IterPipe(self)
+        pipe._instrument = (callback,)
+        return pipe
 
     def islice(self, *args, **kwargs):
         """
@@ -161,21 +660,58 @@ class IterPipe(Iterator):
         https://docs.python.org/3/library/itertools.html#itertools.islice
         :rtype: IterPipe
         """
-        return IterPipe(itertools.islice(self, *args, **kwargs))
+        return self._then("islice", _build_islice, args, kwargs)
+
+    def join(self, other, left_key=None, right_key=None, how="inner", build="right", max_memory_items=None,
+             tmp_dir=None):
+        """
+        Hash join with another iterable, returning (item, other item) pairs with equal keys.
+
+        A hash table is built from the build side, which should be the smaller one, and the other side is streamed
+        through it. Unmatched items of the outer side(s) of a 'left', 'right' or 'outer' join are paired with None.
+        If the build side has more than max_memory_items items, both sides are partitioned to temporary files in
+        tmp_dir and joined one partition at a time, in which case items must be picklable and output order is not
+        defined.
+
+        :param left_key: Function returning the join key of an item of this pipeline. The item itself if None.
+        :param right_key: Function returning the join key of an item of other. Defaults to left_key.
+        :param how: 'inner', 'left', 'right' or 'outer'.
+        :param build: 'right' to build the hash table from other, 'left' to build it from this pipeline.
+        :rtype: IterPipe
+        """
+        return self._then("join", _build_join, other, left_key, right_key, how, build, max_memory_items, tmp_dir)
 
     def list(self):
         """
         Convert iterator to list
         :rtype: list
         """
-        return list(self)
+        return list(self._run())
 
     def map(self, function):
         """
         Apply the given function to each item in the iterator
         :rtype: IterPipe
         """
-        return IterPipe(map(function, self))
+        return self._then("map", _build_map, function)
+
+    def map_batches(self, function, size):
+        """
+        Apply the function to lists of up to size items and yield the items of each returned iterable.
+
+        Useful for functions that are much cheaper per item when called on many items at once.
+        :rtype: IterPipe
+        """
+        return self._then("map_batches", _build_map_batches, function, size)
+
+    def merge_join(self, other, left_key=None, right_key=None, how="inner"):
+        """
+        Join with another iterable when both are sorted ascending by their keys, streaming both sides.
+
+        Only the other side's items for the current key are held in memory. See join for the parameters.
+        :rtype: IterPipe
+        """
+        return self._then("merge_join", _build_merge_join, other, left_key, right_key, how)
 
     def max(self, *args, **kwargs):
         """
@@ -183,7 +719,11 @@ class IterPipe(Iterator):
 
         See https://docs.python.org/3/library/functions.html#max
         """
-        return max(self, *args, **kwargs)
+        if not args and set(kwargs) <= {"default"}:
+            blocks = self._blocks()
+            if blocks is not None:
+                return _vectorized.max_blocks(blocks, **kwargs)
+        return max(self._run(), *args, **kwargs)
 
     def min(self, *args, **kwargs):
         """
@@ -191,7 +731,20 @@ class IterPipe(Iterator):
 
         See https://docs.python.org/3/library/functions.html#min
         """
-        return min(self, *args, **kwargs)
+        if not args and set(kwargs) <= {"default"}:
+            blocks = self._blocks()
+            if blocks is not None:
+                return _vectorized.min_blocks(blocks, **kwargs)
+        return min(self._run(), *args, **kwargs)
+
+    def nlargest(self, n, key=None):
+        """
+        Return a list with the n largest items, using O(n) memory.
+
+        See https://docs.python.org/3/library/heapq.html#heapq.nlargest
+        :rtype: list
+        """
+        return heapq.nlargest(n, self._run(), key=key)
 
     def next(self):
         """
@@ -201,6 +754,85 @@ class IterPipe(Iterator):
         """
         return next(self)
 
+    def nsmallest(self, n, key=None):
+        """
+        Return a list with the n smallest items, using O(n) memory.
+
+        See https://docs.python.org/3/library/heapq.html#heapq.nsmallest
+        :rtype: list
+        """
+        return heapq.nsmallest(n, self._run(), key=key)
+
+    def optimize(self):
+        """
+        Return a new IterPipe with the recorded plan rewritten to do less work for the same output.
+
+        islice is moved before map, starmap, cached_map and enumerate so dropped items are not mapped; sorted
+        followed by islice becomes a bounded-heap top_k; filter and filterfalse are moved before sorted, and before
+        maps when their predicate is wrapped in IterPipe.optimizer.commuting. The functions of moved stages must not
+        have side effects, as they may be called on fewer items. See explain.
+
+        :rtype: IterPipe
+        """
+        pipe = IterPipe(self)
+        pipe._stages, _ = optimizer.optimize(pipe._stages)
+        return pipe
+
+    def par_filter(self, function, workers=None, chunksize=64, ordered=True, executor="process", transport="pickle"):
+        """
+        Like filter, but evaluate the predicate on a pool of workers, one chunk of items per task.
+
+        At most two chunks per worker are in flight, so memory stays flat on unbounded iterators. Exceptions raised by
+        the predicate are re-raised to the consumer, with the worker traceback attached for process pools.
+
+        :param workers: Number of workers. Defaults to the number of CPUs.
+        :param chunksize: Number of items sent to a worker per task.
+        :param ordered: Keep input order if true, otherwise yield chunks as soon as they complete.
+        :param executor: 'process', 'thread' or an existing concurrent.futures.Executor.
+        :param transport: 'pickle', or 'shared_memory' to hand chunks of bytes, array.array or NumPy arrays to
+            process pool workers through reused shared memory blocks instead of pickling them. Other chunks are
+            pickled as usual.
+        :rtype: IterPipe
+        """
+        return self._then("par_filter", _build_parallel, parallel.filter_chunk, function, workers, chunksize, ordered,
+                          executor, transport)
+
+    def par_map(self, function, workers=None, chunksize=64, ordered=True, executor="process", transport="pickle"):
+        """
+        Like map, but apply the function on a pool of workers, one chunk of items per task.
+
+        See par_filter for the meaning of the parameters.
+        :rtype: IterPipe
+        """
+        return self._then("par_map", _build_parallel, parallel.map_chunk, function, workers, chunksize, ordered,
+                          executor, transport)
+
+    def par_starmap(self, function, workers=None, chunksize=64, ordered=True, executor="process", transport="pickle"):
+        """
+        Like starmap, but apply the function on a pool of workers, one chunk of argument tuples per task.
+
+        See par_filter for the meaning of the parameters.
+        :rtype: IterPipe
+        """
+        return self._then("par_starmap", _build_parallel, parallel.starmap_chunk, function, workers, chunksize,
+                          ordered, executor, transport)
+
+    def partition_by(self, key=None, n=None):
+        """
+        Hash-partition the items by key(item) over n worker processes, each running the stages chained up to gather.
+
+        Items with equal keys go to the same worker, so per-key stages such as aggregate_by, count_by or distinct
+        give complete results per worker. Items, outputs and the partitioned stages are pickled between processes, so
+        the functions of those stages must be picklable, e.g. defined at module level rather than lambdas or local
+        functions; only the fork start method, where available, does without. key runs in the consumer and may be
+        any function. Without gather the items pass through unchanged.
+
+        :param key: Function of an item to partition by. Defaults to the item itself.
+        :param n: Number of partitions and worker processes. Defaults to the number of CPUs.
+        :rtype: IterPipe
+        """
+        return self._then("partition_by", _build_partition_by, key, n)
+
     def permutations(self, r=None):
         """
         Return successive r-length permutations of elements in the iterable
@@ -208,7 +840,18 @@ class IterPipe(Iterator):
         See https://docs.python.org/3.7/library/itertools.html#itertools.permutations
         :rtype: IterPipe
         """
-        return IterPipe(itertools.permutations(self, r=r))
+        return self._then("permutations", _build_permutations, r)
+
+    def prefetch(self, n):
+        """
+        Pull items ahead on a background thread into a queue of at most n items, so slow upstream I/O overlaps with
+        the work of the stages downstream.
+
+        Errors raised upstream are raised again when the item is reached. The upstream stages run on the background
+        thread.
+        :rtype: IterPipe
+        """
+        return self._then("prefetch", flow.prefetch, n)
 
     def product(self, *iterables, repeat=1):
         """
@@ -217,7 +860,84 @@ class IterPipe(Iterator):
         See https://docs.python.org/3.7/library/itertools.html#itertools.product
         :rtype: IterPipe
         """
-        return IterPipe(itertools.product(self, *iterables, repeat=repeat))
+        return self._then("product", _build_product, iterables, repeat)
+
+    def report(self):
+        """
+        Return per-stage statistics of an instrumented pipeline, starting with its source.
+
+        Each entry is a StageReport with the stage name, items in and out, selectivity, wall and CPU time spent in
+        the stage itself and the wall time it spent waiting on its upstream stage.
+
+        :rtype: tuple
+        """
+        if self._instrument is None:
+            raise ValueError("report() needs a pipeline created with instrument()")
+        if self._probes is None:
+            return ()
+        return profiling.report(self._probes)
+
+    def resume(self, checkpoint=None):
+        """
+        Continue from a snapshot saved by checkpoint, without reprocessing the items emitted before it.
+
+        The source is skipped to the saved position: sequences are indexed directly, other iterables are advanced
+        without passing the skipped items through the stages. The pipeline must have the same stages as the one that
+        saved the snapshot.
+
+        :param checkpoint: The snapshot, by default the one loaded from the store given to checkpoint.
+        :rtype: IterPipe
+        """
+        store, every, _ = self._checkpoint or (None, 1, None)
+        if checkpoint is None:
+            if store is None:
+                raise ValueError("resume() needs a checkpoint or a pipeline created with checkpoint()")
+            checkpoint = store.load()
+        pipe = IterPipe(self)
+        pipe._checkpoint = (store, every, checkpoint)
+        return pipe
+
+    def rolling_max(self, n):
+        """
+        Return the maximum of each window of n consecutive items, in amortized O(1) per item.
+
+        :rtype: IterPipe
+        """
+        return self._then("rolling_max", windows.rolling_max, n)
+
+    def rolling_mean(self, n):
+        """
+        Return the mean of each window of n consecutive items, in O(1) per item.
+
+        :rtype: IterPipe
+        """
+        return self._then("rolling_mean", windows.rolling_mean, n)
+
+    def rolling_min(self, n):
+        """
+        Return the minimum of each window of n consecutive items, in amortized O(1) per item.
+
+        :rtype: IterPipe
+        """
+        return self._then("rolling_min", windows.rolling_min, n)
+
+    def rolling_sum(self, n):
+        """
+        Return the sum of each window of n consecutive items, in O(1) per item.
+
+        The running sum is updated by adding and subtracting, so float results can differ from sum() in the last bits.
+        :rtype: IterPipe
+        """
+        return self._then("rolling_sum", windows.rolling_sum, n)
+
+    def session(self, gap, key=None):
+        """
+        Group consecutive items into lists, starting a new list when the key, e.g. a timestamp, increases by more
+        than gap. The item itself is used as key if key is None.
+
+        :rtype: IterPipe
+        """
+        return self._then("session", windows.session, gap, key)
 
     def set(self):
         """
@@ -227,7 +947,15 @@ class IterPipe(Iterator):
         :rtype: set
         """
 
-        return set(self)
+        return set(self._run())
+
+    def sliding(self, n, step=1):
+        """
+        Return tuples of n consecutive items, starting a new window every step items. Incomplete windows are dropped.
+
+        :rtype: IterPipe
+        """
+        return self._then("sliding", windows.sliding, n, step)
 
     def sorted(self, key=None, reverse=False):
         """
@@ -236,7 +964,7 @@ class IterPipe(Iterator):
         See https://docs.python.org/3/library/functions.html#sorted
         :rtype: IterPipe
         """
-        return IterPipe(sorted(self, key=key, reverse=reverse))
+        return self._then("sorted", _build_sorted, key, reverse)
 
     def starmap(self, function):
         """
@@ -244,7 +972,16 @@ class IterPipe(Iterator):
 
         See https://docs.python.org/3.7/library/itertools.html#itertools.starmap
         """
-        return IterPipe(itertools.starmap(function, self))
+        return self._then("starmap", _build_starmap, function)
+
+    def stats(self):
+        """
+        Return count, sum, min, max, mean, sample variance and standard deviation of numeric items in a single pass.
+
+        See IterPipe.reducers.Stats
+        :rtype: StatsResult
+        """
+        return self.aggregate(stats=_reducers.Stats)["stats"]
 
     def sum(self, *args):
         """
@@ -252,7 +989,18 @@ class IterPipe(Iterator):
 
         See https://docs.python.org/3/library/functions.html#sum
         """
-        return sum(self, *args)
+        blocks = self._blocks()
+        if blocks is not None:
+            return _vectorized.sum_blocks(blocks, *args)
+        return sum(self._run(), *args)
+
+    def sum_by(self, key, value=None, max_keys=None, tmp_dir=None):
+        """
+        Yield (key, sum of value(item)) pairs, summing the items themselves if value is None. See aggregate_by.
+
+        :rtype: IterPipe
+        """
+        return self._then("sum_by", grouping.sum_by, key, value, max_keys, tmp_dir)
 
     def takewhile(self, predicate):
         """
@@ -261,15 +1009,54 @@ class IterPipe(Iterator):
         See https://docs.python.org/3.7/library/itertools.html#itertools.takewhile
         :rtype: IterPipe
         """
-        return IterPipe(itertools.takewhile(predicate, self))
+        return self._then("takewhile", _build_takewhile, predicate)
 
-    def tee(self, n=2):
+    def tee(self, n=2, max_buffer=None, block=False):
         """
-        Return tuple of n independent iterators
+        Return tuple of n independent IterPipe branches
+
+        If max_buffer is given, at most that many items are buffered for branches that are behind. When the limit is
+        reached, advancing the leading branch raises BufferError, or waits for the other branches to catch up if block
+        is true, which requires the branches to be consumed from different threads.
 
         See https://docs.python.org/3.7/library/itertools.html#itertools.tee
+        :rtype: tuple
         """
-        return itertools.tee(self, n)
+        if max_buffer is None:
+            branches = itertools.tee(self._run(), n)
+        else:
+            branches = fanout.tee(self._run(), n, max_buffer, block)
+        return tuple(IterPipe(branch) for branch in branches)
+
+    def throttle(self, rate, burst=1):
+        """
+        Let items through at most rate items per second on average, with bursts of up to burst items, using a token
+        bucket.
+
+        :rtype: IterPipe
+        """
+        return self._then("throttle", flow.throttle, rate, burst)
+
+    def to_file(self, path, buffer_size=None, sep=b"\n", encoding="utf-8", mode="wb"):
+        """
+        Write each item followed by sep to a file, in blocks of many items, and return the number of items written.
+
+        Items may be bytes-like objects, such as the memoryviews of from_mmap, or str encoded with encoding. Use
+        mode="ab" to append.
+        :param buffer_size: Defaults to IterPipe.files.DEFAULT_BUFFER_SIZE.
+        :rtype: int
+        """
+        if buffer_size is None:
+            buffer_size = files.DEFAULT_BUFFER_SIZE
+        return files.to_file(self._run(), path, buffer_size, sep, encoding, mode)
+
+    def top_k(self, k, key=None, reverse=False):
+        """
+        Return the first k items in sorted order as a list, equivalent to sorted(...)[:k] but using O(k) memory.
+
+        :rtype: list
+        """
+        return sorting.top_k(self._run(), k, key, reverse)
 
     def tuple(self):
         """
@@ -277,7 +1064,43 @@ class IterPipe(Iterator):
 
         See https://docs.python.org/3/library/functions.html#func-tuple
         """
-        return tuple(self)
+        return tuple(self._run())
+
+    def tumbling(self, n):
+        """
+        Return tuples of n consecutive, non-overlapping items. The last window may be shorter.
+
+        :rtype: IterPipe
+        """
+        return self._then("tumbling", _build_batch, n, None, tuple)
+
+    def unbatch(self):
+        """
+        Flatten an iterator of iterables into their items. The inverse of batch.
+
+        See https://docs.python.org/3/library/itertools.html#itertools.chain.from_iterable
+        :rtype: IterPipe
+        """
+        return self._then("unbatch", _build_unbatch)
+
+    def vectorized(self, block_size=None):
+        """
+        Run the following numeric stages on NumPy blocks when possible.
+
+        Applies when called directly on a range, array.array or one-dimensional NumPy array source. The map, filter,
+        filterfalse and accumulate (add, mul, max or min) stages that follow are applied to blocks of block_size items,
+        and sum, min and max reduce the blocks directly. Any other stage, and everything after it, runs element-wise.
+        Functions other than NumPy ufuncs are called with whole blocks and checked against per-element calls on a
+        few items; a stage whose function does not pass runs element-wise, along with the stages after it. Functions
+        must therefore be pure. Integer stages whose results could wrap around fall back to Python ints. Without
+        NumPy installed this stage has no effect.
+
+        :param block_size: Defaults to IterPipe.vectorized.DEFAULT_BLOCK_SIZE.
+        :rtype: IterPipe
+        """
+        if block_size is None:
+            block_size = _vectorized.DEFAULT_BLOCK_SIZE
+        return self._then("vectorized", _build_vectorized, block_size)
 
     def zip(self, *iterables):
         """Zip the iterator with provided iterables
@@ -285,7 +1108,7 @@ class IterPipe(Iterator):
         See https://docs.python.org/3/library/functions.html#zip
         :rtype: IterPipe
         """
-        return zip(self, *iterables)
+        return self._then("zip", _build_zip, iterables)
 
     def zip_longest(self, *iterables, fillvalue=None):
         """
@@ -295,7 +1118,17 @@ class IterPipe(Iterator):
         :param kwargs:
         :return:
         """
-        return IterPipe(itertools.zip_longest(self, *iterables, fillvalue=fillvalue))
+        return self._then("zip_longest", _build_zip_longest, iterables, fillvalue)
+
+    def quantiles(self, *quantiles, k=200, seed=None):
+        """
+        Return approximate values at the given quantiles, e.g. quantiles(0.5, 0.99), in a single pass and bounded
+        memory, using a KLL sketch.
+
+        See IterPipe.reducers.Quantiles
+        :rtype: tuple
+        """
+        return self.aggregate(quantiles=_reducers.Quantiles(quantiles or (0.5,), k, seed))["quantiles"]
 
     def reduce(self, function, initializer=None):
         """
@@ -303,4 +1136,8 @@ class IterPipe(Iterator):
 
         See https://docs.python.org/3/library/functools.html?highlight=reduce#functools.reduce
         """
-        return functools.reduce(function, self, initializer)
+        return functools.reduce(function, self._run(), initializer)
+
+
+# Registered rather than inherited: an ABC base makes instance creation and isinstance checks several times slower.
+Iterator.register(IterPipe)
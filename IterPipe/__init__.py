@@ -1,3 +1,27 @@
+import importlib
+
 from .IterPipe import IterPipe
+from .plugins import register
 
 name = "IterPipe"
+
+# Imported on first access, so that importing IterPipe does not import asyncio.
+_LAZY = {
+    "AsyncIterPipe": ".AsyncIterPipe",
+    "Cache": ".caching",
+    "commuting": ".optimizer",
+}
+
+
+def __getattr__(attribute):
+    module = _LAZY.get(attribute)
+    if module is None:
+        raise AttributeError("module {name!r} has no attribute {attribute!r}"
+                             .format(name=__name__, attribute=attribute))
+    value = getattr(importlib.import_module(module, __name__), attribute)
+    globals()[attribute] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,141 @@
+from collections import OrderedDict, defaultdict, namedtuple
+import contextlib
+import threading
+import time
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "evictions", "maxsize", "currsize"])
+
+_missing = object()
+
+
+class Cache:
+    """
+    Memoization cache with LRU or LFU eviction, an optional time-to-live and hit/miss/eviction statistics.
+
+    One Cache can be shared by many pipelines. Pass thread_safe=True when it is used from several threads, e.g. by
+    par_map with a thread executor; process executors get a separate copy of the cache in each worker.
+
+    :param maxsize: Maximum number of entries, or None for no limit.
+    :param ttl: Seconds after which an entry expires, or None.
+    :param policy: 'lru' evicts the least recently used entry, 'lfu' the least frequently used one (least recently
+        used among equals).
+    """
+
+    def __init__(self, maxsize=128, ttl=None, policy="lru", thread_safe=False, timer=time.monotonic):
+        if policy not in ("lru", "lfu"):
+            raise ValueError("policy must be 'lru' or 'lfu', not {policy!r}".format(policy=policy))
+        if maxsize is not None and maxsize < 1:
+            raise ValueError("maxsize must be at least 1 or None")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._timer = timer
+        self._lock = threading.Lock() if thread_safe else contextlib.nullcontext()
+        # key -> [value, expiry time, use count]
+        self._entries = OrderedDict()
+        # LFU only: use count -> keys with that count, least recently used first
+        self._counts = defaultdict(OrderedDict)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for key, or default if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= self._timer():
+                self._remove(key)
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._touch(key, entry)
+            return entry[0]
+
+    def put(self, key, value):
+        """
+        Store value for key, evicting an entry if the cache is full.
+        """
+        expires = None if self.ttl is None else self._timer() + self.ttl
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[0] = value
+                entry[1] = expires
+                self._touch(key, entry)
+                return
+            if self.maxsize is not None and len(self._entries) >= self.maxsize:
+                self._evict()
+            self._entries[key] = [value, expires, 1]
+            if self.policy == "lfu":
+                self._counts[1][key] = None
+
+    def wrap(self, function, key=None):
+        """
+        Return a function that calls function(item) through this cache.
+
+        :param key: Function returning the cache key of an item, for items that are not hashable or when only part
+            of the item determines the result. The item itself is used if None.
+        """
+        get = self.get
+        put = self.put
+
+        def cached(item):
+            cache_key = item if key is None else key(item)
+            value = get(cache_key, _missing)
+            if value is _missing:
+                value = function(item)
+                put(cache_key, value)
+            return value
+
+        return cached
+
+    def info(self):
+        """
+        :rtype: CacheInfo
+        """
+        return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self._entries))
+
+    def clear(self):
+        """
+        Remove all entries. Statistics are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._counts.clear()
+
+    def _touch(self, key, entry):
+        if self.policy == "lru":
+            self._entries.move_to_end(key)
+            return
+        count = entry[2]
+        keys = self._counts[count]
+        del keys[key]
+        if not keys:
+            del self._counts[count]
+        entry[2] = count + 1
+        self._counts[count + 1][key] = None
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        if self.policy == "lfu":
+            keys = self._counts[entry[2]]
+            del keys[key]
+            if not keys:
+                del self._counts[entry[2]]
+
+    def _evict(self):
+        if self.policy == "lru":
+            self._entries.popitem(last=False)
+        else:
+            keys = self._counts[min(self._counts)]
+            self._remove(next(iter(keys)))
+        self.evictions += 1
@@ -0,0 +1,256 @@
+"""
+Checkpointing of long-running pipelines.
+
+A checkpointed pipeline counts the items taken from its source and keeps the state of its stateful stages
+(enumerate counters, accumulate totals, islice positions, dropwhile/takewhile progress). Every few items a snapshot
+is saved to a checkpoint store, and a pipeline with the same plan can resume from it.
+
+Only stages that take exactly the upstream items they need are supported, so that a snapshot is consistent.
+Stateless stages are built as usual.
+"""
+from collections.abc import Iterator, Sequence
+import itertools
+import os
+import pickle
+import tempfile
+
+
+class MemoryCheckpointStore:
+    """
+    Keeps the latest checkpoint in memory.
+    """
+
+    def __init__(self):
+        self.checkpoint = None
+
+    def save(self, checkpoint):
+        self.checkpoint = checkpoint
+
+    def load(self):
+        return self.checkpoint
+
+
+class FileCheckpointStore:
+    """
+    Keeps the latest checkpoint in a file, replaced atomically on each save. Checkpoints are pickled.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def save(self, checkpoint):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        descriptor, tmp_path = tempfile.mkstemp(dir=directory, prefix=".checkpoint-")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                pickle.dump(checkpoint, file, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as file:
+                return pickle.load(file)
+        except FileNotFoundError:
+            return None
+
+
+class _Source(Iterator):
+    def __init__(self, source, offset):
+        if offset == 0:
+            self.iterator = iter(source)
+        elif isinstance(source, Sequence):
+            self.iterator = map(source.__getitem__, range(offset, len(source)))
+        else:
+            # Skip items the previous run took, without passing them through the stages.
+            self.iterator = iter(source)
+            next(itertools.islice(self.iterator, offset, offset), None)
+        self.offset = offset
+
+    def __next__(self):
+        item = next(self.iterator)
+        self.offset += 1
+        return item
+
+
+class _Enumerate(Iterator):
+    def __init__(self, iterator, kwarg, state):
+        self.iterator = iterator
+        self.count = kwarg.get("start", 0) if state is None else state
+
+    def __next__(self):
+        item = next(self.iterator)
+        count = self.count
+        self.count = count + 1
+        return count, item
+
+    def state(self):
+        return self.count
+
+
+class _Accumulate(Iterator):
+    def __init__(self, iterator, func, state):
+        self.iterator = iterator
+        self.func = func
+        self.started, self.total = (False, None) if state is None else state
+
+    def __next__(self):
+        item = next(self.iterator)
+        if self.started:
+            self.total = self.func(self.total, item)
+        else:
+            self.started = True
+            self.total = item
+        return self.total
+
+    def state(self):
+        return self.started, self.total
+
+
+class _ISlice(Iterator):
+    def __init__(self, iterator, args, kwargs, state):
+        bounds = slice(*args, **kwargs)
+        self.iterator = iterator
+        self.start = bounds.start or 0
+        self.stop = bounds.stop
+        self.step = bounds.step or 1
+        # Number of upstream items taken so far
+        self.index = 0 if state is None else state
+
+    def __next__(self):
+        index = self.index
+        if index < self.start:
+            wanted = self.start
+        else:
+            wanted = index + (self.start - index) % self.step
+        if self.stop is not None and wanted >= self.stop:
+            raise StopIteration
+        while index < wanted:
+            next(self.iterator)
+            index += 1
+            self.index = index
+        item = next(self.iterator)
+        self.index = index + 1
+        return item
+
+    def state(self):
+        return self.index
+
+
+class _DropWhile(Iterator):
+    def __init__(self, iterator, predicate, state):
+        self.iterator = iterator
+        self.predicate = predicate
+        self.dropping = True if state is None else state
+
+    def __next__(self):
+        if self.dropping:
+            for item in self.iterator:
+                if not self.predicate(item):
+                    self.dropping = False
+                    return item
+            raise StopIteration
+        return next(self.iterator)
+
+    def state(self):
+        return self.dropping
+
+
+class _TakeWhile(Iterator):
+    def __init__(self, iterator, predicate, state):
+        self.iterator = iterator
+        self.predicate = predicate
+        self.taking = True if state is None else state
+
+    def __next__(self):
+        if self.taking:
+            item = next(self.iterator)
+            if self.predicate(item):
+                return item
+            self.taking = False
+        raise StopIteration
+
+    def state(self):
+        return self.taking
+
+
+_STATEFUL = {
+    "accumulate": _Accumulate,
+    "dropwhile": _DropWhile,
+    "enumerate": _Enumerate,
+    "islice": _ISlice,
+    "takewhile": _TakeWhile,
+}
+
+_STATELESS = frozenset(["cached_map", "filter", "filterfalse", "map", "starmap"])
+
+
+class _Checkpointer(Iterator):
+    def __init__(self, source, stages, iterator, store, every, emitted, names):
+        self.source = source
+        self.stages = stages
+        self.iterator = iterator
+        self.store = store
+        self.every = every
+        self.emitted = emitted
+        self.names = names
+        self.saved = emitted
+
+    def snapshot(self, done=False):
+        """
+        :rtype: dict
+        """
+        return {
+            "stages": self.names,
+            "source_offset": self.source.offset,
+            "emitted": self.emitted,
+            "states": [None if stage is None else stage.state() for stage in self.stages],
+            "done": done,
+        }
+
+    def __next__(self):
+        # Items count as done once the consumer asks for the next one, so a snapshot is saved here rather than
+        # straight after an item is handed out.
+        if self.store is not None and self.emitted - self.saved >= self.every:
+            self.store.save(self.snapshot())
+            self.saved = self.emitted
+        try:
+            item = next(self.iterator)
+        except StopIteration:
+            if self.store is not None:
+                self.store.save(self.snapshot(done=True))
+                self.store = None
+            raise
+        self.emitted += 1
+        return item
+
+
+def build(source, stages, store, every, checkpoint):
+    """
+    Build the stages over the source, restoring the state of a previous checkpoint if one is given.
+    """
+    names = [stage.name for stage in stages]
+    for name in names:
+        if name not in _STATEFUL and name not in _STATELESS:
+            raise ValueError("the {name} stage cannot be checkpointed".format(name=name))
+    if checkpoint is None:
+        checkpoint = {"source_offset": 0, "emitted": 0, "states": [None] * len(stages), "done": False}
+    elif checkpoint["stages"] != names:
+        raise ValueError("checkpoint of stages {saved} does not match pipeline stages {names}"
+                         .format(saved=checkpoint["stages"], names=names))
+
+    counted = _Source(source, checkpoint["source_offset"])
+    iterator = counted
+    stateful = []
+    for stage, state in zip(stages, checkpoint["states"]):
+        if stage.name in _STATEFUL:
+            iterator = _STATEFUL[stage.name](iterator, *stage.args, state)
+            stateful.append(iterator)
+        else:
+            iterator = stage.build(iterator, *stage.args)
+            stateful.append(None)
+    if checkpoint["done"]:
+        iterator = iter(())
+    return _Checkpointer(counted, stateful, iterator, store, every, checkpoint["emitted"], names)
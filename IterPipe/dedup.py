@@ -0,0 +1,100 @@
+from collections import OrderedDict
+import math
+
+from .reducers import hash64, mix64
+
+
+MODES = ("exact", "bloom", "window")
+
+
+class BloomFilter:
+    """
+    Set membership with false positives but no false negatives, in a compact bit array.
+
+    Sized so that the false positive rate is error_rate after capacity distinct items have been added; it grows
+    beyond that.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _indexes(self, item):
+        # Double hashing: the k indexes are h1 + i * h2.
+        h1 = hash64(item)
+        h2 = mix64(h1) | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, item):
+        """
+        Add item and return whether it was (probably) present already.
+        """
+        bits = self._bits
+        present = True
+        for index in self._indexes(item):
+            byte, mask = index >> 3, 1 << (index & 7)
+            if not bits[byte] & mask:
+                present = False
+                bits[byte] |= mask
+        return present
+
+    def __contains__(self, item):
+        bits = self._bits
+        return all(bits[index >> 3] & (1 << (index & 7)) for index in self._indexes(item))
+
+
+def _exact(iterator, key):
+    seen = set()
+    add = seen.add
+    for item in iterator:
+        k = item if key is None else key(item)
+        if k not in seen:
+            add(k)
+            yield item
+
+
+def _bloom(iterator, key, capacity, error_rate):
+    seen = BloomFilter(capacity, error_rate)
+    add = seen.add
+    for item in iterator:
+        if not add(item if key is None else key(item)):
+            yield item
+
+
+def _window(iterator, key, capacity):
+    # key -> position of its latest occurrence, oldest first
+    recent = OrderedDict()
+    for position, item in enumerate(iterator):
+        k = item if key is None else key(item)
+        while recent:
+            oldest_key, oldest_position = next(iter(recent.items()))
+            if oldest_position >= position - capacity:
+                break
+            del recent[oldest_key]
+        if k in recent:
+            recent.move_to_end(k)
+            recent[k] = position
+        else:
+            recent[k] = position
+            yield item
+
+
+def distinct(iterator, key=None, mode="exact", capacity=None, error_rate=0.01):
+    """
+    Yield the first occurrence of each key. See IterPipe.distinct.
+    """
+    if mode == "exact":
+        return _exact(iterator, key)
+    if capacity is None or capacity < 1:
+        raise ValueError("{mode} mode needs a capacity of at least 1".format(mode=mode))
+    if mode == "bloom":
+        return _bloom(iterator, key, capacity, error_rate)
+    if mode == "window":
+        return _window(iterator, key, capacity)
+    raise ValueError("mode must be one of {modes}, not {mode!r}".format(modes=", ".join(MODES), mode=mode))
@@ -0,0 +1,135 @@
+from collections import deque
+from collections.abc import Iterator
+import threading
+
+
+DEFAULT_MAX_BUFFER = 1024
+
+
+class _Broadcaster:
+    """
+    Shares one pass over an iterator between several branches, buffering at most max_buffer items.
+
+    The buffer holds the items between the slowest and the fastest branch. When it is full the fastest branch either
+    waits for the slowest one (block=True, for branches consumed from different threads) or raises BufferError.
+    """
+
+    def __init__(self, iterator, n, max_buffer, block):
+        if max_buffer < 1:
+            raise ValueError("max_buffer must be at least 1")
+        self.iterator = iterator
+        self.max_buffer = max_buffer
+        self.block = block
+        self.buffer = deque()
+        # Absolute position of buffer[0] and of the next item of each branch; None for detached branches.
+        self.offset = 0
+        self.positions = [0] * n
+        self.exhausted = False
+        self.error = None
+        self.condition = threading.Condition()
+
+    def next(self, branch):
+        with self.condition:
+            position = self.positions[branch]
+            if position is None:
+                raise ValueError("branch {branch} was closed; a broadcast function must consume its branch before it "
+                                 "returns, e.g. return p.list() rather than a lazy p.map(...)".format(branch=branch))
+            while position - self.offset >= len(self.buffer):
+                if self.error is not None:
+                    raise self.error
+                if self.exhausted:
+                    raise StopIteration
+                if len(self.buffer) >= self.max_buffer:
+                    if not self.block:
+                        raise BufferError("tee buffer limit of {max_buffer} items reached"
+                                          .format(max_buffer=self.max_buffer))
+                    self.condition.wait()
+                    continue
+                try:
+                    self.buffer.append(next(self.iterator))
+                except StopIteration:
+                    self.exhausted = True
+                    self.condition.notify_all()
+                except Exception as error:
+                    self.error = error
+                    self.condition.notify_all()
+            item = self.buffer[position - self.offset]
+            self.positions[branch] = position + 1
+            if position == self.offset:
+                self._trim()
+            return item
+
+    def detach(self, branch):
+        """
+        Stop keeping items for a branch that will not be consumed any further.
+        """
+        with self.condition:
+            self.positions[branch] = None
+            self._trim()
+
+    def _trim(self):
+        positions = [position for position in self.positions if position is not None]
+        lowest = min(positions) if positions else self.offset + len(self.buffer)
+        if lowest > self.offset:
+            for _ in range(lowest - self.offset):
+                self.buffer.popleft()
+            self.offset = lowest
+            self.condition.notify_all()
+
+
+class Branch(Iterator):
+    """
+    One of the iterators returned by tee.
+    """
+
+    def __init__(self, broadcaster, index):
+        self._broadcaster = broadcaster
+        self._index = index
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self._broadcaster.next(self._index)
+
+    def close(self):
+        """
+        Detach this branch so the other branches are not held back by it. Reading it afterwards raises ValueError.
+        """
+        self._broadcaster.detach(self._index)
+
+
+def tee(iterator, n, max_buffer, block=False):
+    """
+    Return n Branch iterators sharing one pass over the iterator, with at most max_buffer items buffered.
+    """
+    broadcaster = _Broadcaster(iterator, n, max_buffer, block)
+    return tuple(Branch(broadcaster, index) for index in range(n))
+
+
+def broadcast(iterator, functions, max_buffer, wrap):
+    """
+    Call each function with its own branch of the iterator, each in its own thread, and return their results.
+
+    :param wrap: Called with each branch to create the argument passed to the function.
+    """
+    branches = tee(iterator, len(functions), max_buffer, block=True)
+    results = [None] * len(functions)
+    errors = []
+
+    def target(index):
+        try:
+            results[index] = functions[index](wrap(branches[index]))
+        except BaseException as error:
+            errors.append(error)
+        finally:
+            branches[index].close()
+
+    threads = [threading.Thread(target=target, args=(index,), daemon=True) for index in range(len(functions))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return tuple(results)
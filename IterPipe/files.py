@@ -0,0 +1,150 @@
+import itertools
+import mmap
+import struct
+
+
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+# Number of items joined into a single write by to_file.
+_WRITE_BATCH = 4096
+
+
+def _open_mmap(path):
+    """
+    Return a read-only mmap of the file at path, or None if the file is empty.
+    """
+    with open(path, "rb") as file:
+        try:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return None
+
+
+def _close(mapped, view=None):
+    try:
+        if view is not None:
+            view.release()
+        mapped.close()
+    except BufferError:
+        # Slices handed out are still alive; the map is released when they are.
+        pass
+
+
+def from_mmap(path, sep=b"\n"):
+    """
+    Yield memoryview slices of the memory-mapped file at path, split on sep. Separators are not included.
+    """
+    if not sep:
+        raise ValueError("sep must not be empty")
+    return _split(path, sep)
+
+
+def _split(path, sep):
+    mapped = _open_mmap(path)
+    if mapped is None:
+        return
+    view = memoryview(mapped)
+    try:
+        find = mapped.find
+        size = len(mapped)
+        width = len(sep)
+        start = 0
+        while start < size:
+            end = find(sep, start)
+            if end < 0:
+                yield view[start:]
+                return
+            yield view[start:end]
+            start = end + width
+    finally:
+        _close(mapped, view)
+
+
+def _split_lines(data, newline, crlf):
+    """
+    Split bytes or str data on newline, after replacing crlf (the "\r\n" of the same type) with newline, if given.
+    """
+    if crlf is not None:
+        data = data.replace(crlf, newline)
+    return data.split(newline)
+
+
+def from_lines(path, encoding="utf-8", errors="strict"):
+    """
+    Yield the lines of the file at path, without line endings, decoded with encoding, or as bytes if it is None.
+
+    Lines end with "\n" or "\r\n". The map is decoded and split in blocks of about DEFAULT_BUFFER_SIZE bytes that
+    end on a line break, rather than read and decoded line by line.
+    """
+    mapped = _open_mmap(path)
+    if mapped is None:
+        return
+    view = memoryview(mapped)
+    try:
+        size = len(mapped)
+        start = 0
+        while start < size:
+            end = start + DEFAULT_BUFFER_SIZE
+            if end < size:
+                cut = mapped.rfind(b"\n", start, end)
+                if cut < 0:
+                    # A line longer than a block
+                    cut = mapped.find(b"\n", end)
+                end = size if cut < 0 else cut + 1
+            else:
+                end = size
+            has_crlf = mapped.find(b"\r\n", start, end) >= 0
+            # Leave out the line ending of the last line, so that splitting the block gives exactly its lines.
+            stop = end
+            if mapped[stop - 1] == 10:
+                stop -= 1
+                if has_crlf and stop > start and mapped[stop - 1] == 13:
+                    stop -= 1
+            if encoding is None:
+                yield from _split_lines(mapped[start:stop], b"\n", b"\r\n" if has_crlf else None)
+            else:
+                try:
+                    lines = _split_lines(str(view[start:stop], encoding, errors), "\n", "\r\n" if has_crlf else None)
+                except UnicodeDecodeError:
+                    # Raise at the offending line, after the lines before it.
+                    lines = _split_lines(mapped[start:stop], b"\n", b"\r\n" if has_crlf else None)
+                    lines = (str(line, encoding, errors) for line in lines)
+                yield from lines
+            start = end
+    finally:
+        _close(mapped, view)
+
+
+def from_records(path, struct_fmt):
+    """
+    Yield tuples unpacked from consecutive fixed-size records in the file at path.
+
+    See https://docs.python.org/3/library/struct.html#struct.iter_unpack
+    """
+    mapped = _open_mmap(path)
+    if mapped is None:
+        return
+    view = memoryview(mapped)
+    try:
+        yield from struct.Struct(struct_fmt).iter_unpack(view)
+    finally:
+        _close(mapped, view)
+
+
+def to_file(iterator, path, buffer_size=DEFAULT_BUFFER_SIZE, sep=b"\n", encoding="utf-8", mode="wb"):
+    """
+    Write the items, each followed by sep, to the file at path in large blocks and return the number of items.
+
+    Items may be bytes-like objects, or str which are encoded with encoding.
+    """
+    count = 0
+    with open(path, mode, buffering=buffer_size) as file:
+        write = file.write
+        for batch in iter(lambda: list(itertools.islice(iterator, _WRITE_BATCH)), []):
+            if encoding is not None:
+                batch = [item.encode(encoding) if isinstance(item, str) else item for item in batch]
+            batch.append(b"")
+            write(sep.join(batch))
+            count += len(batch) - 1
+    return count
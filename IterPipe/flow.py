@@ -0,0 +1,94 @@
+import queue
+import threading
+import time
+
+
+# How often a producer blocked on a full queue checks whether the consumer has gone away, and how often a consumer
+# waiting on a queue checks for failures, in seconds.
+_POLL_INTERVAL = 0.1
+
+
+class _End:
+    pass
+
+
+class _Failure:
+    def __init__(self, error, traceback=None):
+        self.error = error
+        # Formatted traceback, for errors raised in another process
+        self.traceback = traceback
+
+
+def _put(items, stop, entry):
+    while not stop.is_set():
+        try:
+            items.put(entry, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _produce(iterator, items, stop):
+    try:
+        for item in iterator:
+            if not _put(items, stop, item):
+                return
+    except BaseException as error:
+        _put(items, stop, _Failure(error))
+    else:
+        _put(items, stop, _End)
+
+
+def prefetch(iterator, n):
+    """
+    Yield the items of the iterator, pulled ahead on a background thread into a queue of at most n items.
+
+    Errors raised upstream are raised again in the consumer. The thread stops once the consumer closes this
+    iterator, at the latest when its queue has room again or after the upstream item it is waiting for.
+    """
+    if n < 1:
+        raise ValueError("prefetch size must be at least 1")
+    items = queue.Queue(n)
+    stop = threading.Event()
+    thread = threading.Thread(target=_produce, args=(iterator, items, stop), daemon=True)
+    thread.start()
+    get = items.get
+    try:
+        while True:
+            item = get()
+            if item is _End:
+                return
+            if type(item) is _Failure:
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+
+
+def throttle(iterator, rate, burst=1):
+    """
+    Yield the items of the iterator at most rate items per second on average, allowing bursts of up to burst items.
+
+    A token bucket of size burst is refilled at rate tokens per second; each item takes a token, sleeping until
+    one is available. Items are pulled from upstream before waiting, so upstream work overlaps with the wait.
+    """
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    if burst < 1:
+        raise ValueError("burst must be at least 1")
+    clock = time.monotonic
+    sleep = time.sleep
+    tokens = burst
+    last = clock()
+    for item in iterator:
+        now = clock()
+        tokens = min(burst, tokens + (now - last) * rate)
+        last = now
+        if tokens < 1:
+            wait = (1 - tokens) / rate
+            sleep(wait)
+            tokens = 1
+            last = now + wait
+        tokens -= 1
+        yield item
@@ -0,0 +1,86 @@
+import functools
+import operator
+import pickle
+import tempfile
+
+
+SPILL_PARTITIONS = 16
+
+
+def _identity(item):
+    return item
+
+
+def _spill(table, files):
+    partitions = [[] for _ in files]
+    for pair in table.items():
+        partitions[hash(pair[0]) % len(files)].append(pair)
+    for partition, file in zip(partitions, files):
+        if partition:
+            pickle.dump(partition, file, pickle.HIGHEST_PROTOCOL)
+
+
+def _load(file):
+    file.seek(0)
+    while True:
+        try:
+            yield from pickle.load(file)
+        except EOFError:
+            return
+
+
+def aggregate_by(iterator, key, init, step, merge=None, max_keys=None, tmp_dir=None):
+    """
+    Aggregate items per key in one pass and yield (key, aggregate) pairs.
+
+    Memory is proportional to the number of distinct keys. If max_keys is given, the partial aggregates are spilled to
+    hash-partitioned temporary files whenever the table grows beyond it, and the partitions are merged one at a time
+    at the end, so at most about 1/SPILL_PARTITIONS of the keys are held at once. Spilling requires merge, and keys
+    and aggregates must be picklable.
+    """
+    if max_keys is not None and merge is None:
+        raise ValueError("aggregate_by needs a merge function to spill partial aggregates")
+    if key is None:
+        key = _identity
+    table = {}
+    files = None
+    try:
+        for item in iterator:
+            k = key(item)
+            table[k] = step(table[k] if k in table else init(), item)
+            if max_keys is not None and len(table) > max_keys:
+                if files is None:
+                    files = [tempfile.TemporaryFile(dir=tmp_dir) for _ in range(SPILL_PARTITIONS)]
+                _spill(table, files)
+                table = {}
+
+        if files is None:
+            yield from table.items()
+            return
+        _spill(table, files)
+        table = None
+        for file in files:
+            merged = {}
+            for k, value in _load(file):
+                merged[k] = merge(merged[k], value) if k in merged else value
+            yield from merged.items()
+    finally:
+        for file in files or ():
+            file.close()
+
+
+def _count_step(count, item):
+    return count + 1
+
+
+def _sum_step(value, total, item):
+    return total + value(item)
+
+
+def count_by(iterator, key, max_keys=None, tmp_dir=None):
+    return aggregate_by(iterator, key, int, _count_step, operator.add, max_keys, tmp_dir)
+
+
+def sum_by(iterator, key, value, max_keys=None, tmp_dir=None):
+    step = functools.partial(_sum_step, value or _identity)
+    return aggregate_by(iterator, key, int, step, operator.add, max_keys, tmp_dir)
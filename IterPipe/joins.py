@@ -0,0 +1,188 @@
+from collections import defaultdict
+import itertools
+import pickle
+import tempfile
+
+
+HOWS = ("inner", "left", "right", "outer")
+
+SPILL_PARTITIONS = 16
+
+# Items buffered per partition before they are pickled to its file.
+_SPILL_BLOCK_SIZE = 1024
+
+
+def _identity(item):
+    return item
+
+
+def _check(how, left_key, right_key):
+    """
+    Validate how and return the (left, right) key functions, defaulting to the items themselves.
+    """
+    if how not in HOWS:
+        raise ValueError("how must be one of {hows}, not {how!r}".format(hows=", ".join(HOWS), how=how))
+    left_key = left_key or _identity
+    return left_key, right_key or left_key
+
+
+class _Partitions:
+    """
+    Hash-partitioned temporary files of items.
+    """
+
+    def __init__(self, tmp_dir):
+        self.files = [tempfile.TemporaryFile(dir=tmp_dir) for _ in range(SPILL_PARTITIONS)]
+        self.buffers = [[] for _ in range(SPILL_PARTITIONS)]
+
+    def add(self, key, item):
+        index = hash(key) % SPILL_PARTITIONS
+        buffer = self.buffers[index]
+        buffer.append(item)
+        if len(buffer) >= _SPILL_BLOCK_SIZE:
+            pickle.dump(buffer, self.files[index], pickle.HIGHEST_PROTOCOL)
+            buffer.clear()
+
+    def read(self, index):
+        file = self.files[index]
+        if self.buffers[index]:
+            pickle.dump(self.buffers[index], file, pickle.HIGHEST_PROTOCOL)
+            self.buffers[index] = []
+        file.seek(0)
+        while True:
+            try:
+                yield from pickle.load(file)
+            except EOFError:
+                return
+
+    def close(self):
+        for file in self.files:
+            file.close()
+
+
+def _probe(table, probe, probe_key, probe_outer, build_outer, orient):
+    matched = set() if build_outer else None
+    for item in probe:
+        key = probe_key(item)
+        matches = table.get(key)
+        if matches is not None:
+            if matched is not None:
+                matched.add(key)
+            for match in matches:
+                yield orient(match, item)
+        elif probe_outer:
+            yield orient(None, item)
+    if build_outer:
+        for key, items in table.items():
+            if key not in matched:
+                for item in items:
+                    yield orient(item, None)
+
+
+def _grace_join(table, build, probe, build_key, probe_key, probe_outer, build_outer, orient, tmp_dir):
+    build_partitions = _Partitions(tmp_dir)
+    probe_partitions = _Partitions(tmp_dir)
+    try:
+        for key, items in table.items():
+            for item in items:
+                build_partitions.add(key, item)
+        table.clear()
+        for item in build:
+            build_partitions.add(build_key(item), item)
+        for item in probe:
+            probe_partitions.add(probe_key(item), item)
+        for index in range(SPILL_PARTITIONS):
+            table = defaultdict(list)
+            for item in build_partitions.read(index):
+                table[build_key(item)].append(item)
+            yield from _probe(table, probe_partitions.read(index), probe_key, probe_outer, build_outer, orient)
+    finally:
+        build_partitions.close()
+        probe_partitions.close()
+
+
+def _build_right(build_item, probe_item):
+    return probe_item, build_item
+
+
+def _build_left(build_item, probe_item):
+    return build_item, probe_item
+
+
+def hash_join(left, right, left_key=None, right_key=None, how="inner", build="right", max_memory_items=None,
+              tmp_dir=None):
+    """
+    Yield (left item, right item) pairs with equal keys, using a hash table of the build side.
+
+    Unmatched items of an outer side are paired with None. Pairs come in the order of the probe side, followed by
+    unmatched build items. If the build side has more than max_memory_items items, both sides are hash-partitioned
+    to temporary files and joined one partition at a time; items must then be picklable and the output order is
+    not defined.
+    """
+    left_key, right_key = _check(how, left_key, right_key)
+    left_outer = how in ("left", "outer")
+    right_outer = how in ("right", "outer")
+    if build == "right":
+        build_items, probe_items, build_key, probe_key = right, left, right_key, left_key
+        build_outer, probe_outer, orient = right_outer, left_outer, _build_right
+    elif build == "left":
+        build_items, probe_items, build_key, probe_key = left, right, left_key, right_key
+        build_outer, probe_outer, orient = left_outer, right_outer, _build_left
+    else:
+        raise ValueError("build must be 'left' or 'right', not {build!r}".format(build=build))
+
+    table = defaultdict(list)
+    build_items = iter(build_items)
+    count = 0
+    for item in build_items:
+        table[build_key(item)].append(item)
+        count += 1
+        if max_memory_items is not None and count > max_memory_items:
+            yield from _grace_join(table, build_items, probe_items, build_key, probe_key, probe_outer, build_outer,
+                                   orient, tmp_dir)
+            return
+    yield from _probe(table, probe_items, probe_key, probe_outer, build_outer, orient)
+
+
+def merge_join(left, right, left_key=None, right_key=None, how="inner"):
+    """
+    Yield (left item, right item) pairs with equal keys from two inputs sorted ascending by their keys.
+
+    Only the items of one right key are held in memory at a time. Unmatched items of an outer side are paired with
+    None.
+    """
+    left_key, right_key = _check(how, left_key, right_key)
+    left_outer = how in ("left", "outer")
+    right_outer = how in ("right", "outer")
+    left_groups = itertools.groupby(left, left_key)
+    right_groups = itertools.groupby(right, right_key)
+    left_group = next(left_groups, None)
+    right_group = next(right_groups, None)
+    while left_group is not None and right_group is not None:
+        if left_group[0] < right_group[0]:
+            if left_outer:
+                for item in left_group[1]:
+                    yield item, None
+            left_group = next(left_groups, None)
+        elif right_group[0] < left_group[0]:
+            if right_outer:
+                for item in right_group[1]:
+                    yield None, item
+            right_group = next(right_groups, None)
+        else:
+            right_items = list(right_group[1])
+            for item in left_group[1]:
+                for right_item in right_items:
+                    yield item, right_item
+            left_group = next(left_groups, None)
+            right_group = next(right_groups, None)
+    if left_outer:
+        while left_group is not None:
+            for item in left_group[1]:
+                yield item, None
+            left_group = next(left_groups, None)
+    if right_outer:
+        while right_group is not None:
+            for item in right_group[1]:
+                yield None, item
+            right_group = next(right_groups, None)
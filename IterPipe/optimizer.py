@@ -0,0 +1,138 @@
+"""
+Rule-based rewriting of pipeline plans. See IterPipe.optimize.
+
+The rules assume that the functions given to map, starmap, cached_map, filter and filterfalse have no side effects,
+since a rewritten plan may call them on fewer items:
+
+* islice is moved before map, starmap and cached_map, and before enumerate when its step is 1, so items it drops are
+  never mapped.
+* sorted followed by islice with a stop becomes top_k, which keeps only stop items in a bounded heap.
+* filter and filterfalse are moved before sorted, and before map, starmap and cached_map when their predicate is
+  marked with commuting.
+"""
+from . import sorting
+
+
+_ONE_TO_ONE = frozenset(["cached_map", "map", "starmap"])
+
+_FILTERS = frozenset(["filter", "filterfalse"])
+
+
+class commuting:
+    """
+    Mark a filter predicate as commuting with the maps it follows: predicate(function(item)) == predicate(item).
+
+    The optimizer may then move the filter before those maps, so they only run on the items that pass.
+    """
+
+    __slots__ = ("predicate",)
+
+    def __init__(self, predicate):
+        self.predicate = predicate
+
+    def __call__(self, item):
+        return self.predicate(item)
+
+    def __repr__(self):
+        return "commuting({predicate})".format(predicate=_describe_argument(self.predicate))
+
+
+def _build_top_k(iterator, k, key, reverse):
+    return iter(sorting.top_k(iterator, k, key, reverse))
+
+
+def _bounds(stage):
+    args, kwargs = stage.args
+    bounds = slice(*args, **kwargs)
+    return bounds.start or 0, bounds.stop, bounds.step or 1
+
+
+def _islice(stage, start, stop, step):
+    if step != 1:
+        args = (start, stop, step)
+    elif start:
+        args = (start, stop)
+    else:
+        args = (stop,)
+    return stage._replace(args=(args, {}))
+
+
+def _rewrite(upstream, stage):
+    """
+    Return (replacement stages, description) for a pair of consecutive stages, or None if no rule applies.
+    """
+    if stage.name == "islice":
+        start, stop, step = _bounds(stage)
+        if upstream.name in _ONE_TO_ONE:
+            return (stage, upstream), "islice before {name}".format(name=upstream.name)
+        if upstream.name == "enumerate" and step == 1 and set(upstream.args[0]) <= {"start"}:
+            counted = upstream._replace(args=({"start": upstream.args[0].get("start", 0) + start},))
+            return (stage, counted), "islice before enumerate"
+        if upstream.name == "sorted" and stop is not None:
+            key, reverse = upstream.args
+            top_k = upstream._replace(name="top_k", build=_build_top_k, args=(stop, key, reverse))
+            if start == 0 and step == 1:
+                return (top_k,), "sorted + islice -> top_k"
+            return (top_k, _islice(stage, start, None, step)), "sorted + islice -> top_k + islice"
+    elif stage.name in _FILTERS:
+        if upstream.name == "sorted":
+            return (stage, upstream), "{name} before sorted".format(name=stage.name)
+        if upstream.name in _ONE_TO_ONE and isinstance(stage.args[0], commuting):
+            return (stage, upstream), "{name} before {upstream}".format(name=stage.name, upstream=upstream.name)
+    return None
+
+
+def optimize(stages):
+    """
+    Rewrite a plan until no rule applies.
+
+    :return: (rewritten stages, descriptions of the rewrites applied, in order)
+    """
+    stages = list(stages)
+    rewrites = []
+    index = 1
+    while index < len(stages):
+        rewrite = _rewrite(stages[index - 1], stages[index])
+        if rewrite is None:
+            index += 1
+            continue
+        replacement, description = rewrite
+        stages[index - 1:index + 1] = replacement
+        rewrites.append(description)
+        # The moved stage may be able to move further up.
+        index = max(1, index - 1)
+    for index, stage in enumerate(stages):
+        if stage.name in _FILTERS and isinstance(stage.args[0], commuting):
+            stages[index] = stage._replace(args=(stage.args[0].predicate,))
+    return tuple(stages), rewrites
+
+
+def _describe_argument(argument):
+    name = getattr(argument, "__name__", None)
+    if name is not None and callable(argument):
+        return name
+    return repr(argument)
+
+
+def describe(stage):
+    """
+    :rtype: str
+    """
+    if stage.name == "islice":
+        arguments = [repr(argument) for argument in stage.args[0]]
+    elif stage.name == "enumerate":
+        arguments = ["{name}={value!r}".format(name=name, value=value) for name, value in stage.args[0].items()]
+    else:
+        arguments = [_describe_argument(argument) for argument in stage.args]
+    return "{name}({arguments})".format(name=stage.name, arguments=", ".join(arguments))
+
+
+def explain(source, stages, rewrites):
+    """
+    :rtype: str
+    """
+    lines = ["plan:", "  source: {source}".format(source=type(source).__name__)]
+    lines.extend("  " + describe(stage) for stage in stages)
+    lines.append("rewrites:")
+    lines.extend("  " + rewrite for rewrite in rewrites or ["none"])
+    return "\n".join(lines)
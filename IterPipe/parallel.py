@@ -0,0 +1,104 @@
+from collections import deque
+from concurrent import futures
+import itertools
+import os
+
+
+def map_chunk(function, chunk):
+    return [function(item) for item in chunk]
+
+
+def filter_chunk(function, chunk):
+    if function is None:
+        return [item for item in chunk if item]
+    return [item for item in chunk if function(item)]
+
+
+def starmap_chunk(function, chunk):
+    return [function(*item) for item in chunk]
+
+
+def _executor(executor, workers):
+    """
+    Return (executor, owned) for the given executor name or instance.
+    """
+    if isinstance(executor, futures.Executor):
+        return executor, False
+    if executor == "process":
+        return futures.ProcessPoolExecutor(max_workers=workers), True
+    if executor == "thread":
+        return futures.ThreadPoolExecutor(max_workers=workers), True
+    raise ValueError("executor must be 'process', 'thread' or a concurrent.futures.Executor, not {executor!r}"
+                     .format(executor=executor))
+
+
+def imap_chunks(iterator, chunk_function, function, workers=None, chunksize=64, ordered=True, executor="process",
+                transport="pickle"):
+    """
+    Apply chunk_function(function, chunk) to successive chunks of the iterator on a pool and yield the results.
+
+    At most two chunks per worker are in flight at any time, so memory use does not grow with the length of the
+    iterator. An exception raised in a worker is re-raised in the consumer; for process pools the worker traceback is
+    attached as its ``__cause__``.
+
+    :param workers: Number of workers. Defaults to the number of CPUs.
+    :param chunksize: Number of items sent to a worker per task.
+    :param ordered: Yield results in input order if true, otherwise as soon as chunks complete.
+    :param executor: 'process', 'thread' or an existing concurrent.futures.Executor, which is not shut down.
+    :param transport: 'pickle', or 'shared_memory' to pass chunks of bytes and arrays to process pool workers
+        through shared memory blocks. See IterPipe.transport.
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    if transport not in ("pickle", "shared_memory"):
+        raise ValueError("transport must be 'pickle' or 'shared_memory', not {transport!r}".format(transport=transport))
+    if transport == "shared_memory":
+        # Imported here, as it imports multiprocessing.shared_memory.
+        from . import transport as _transport
+    workers = workers or os.cpu_count() or 1
+    pool, owned = _executor(executor, workers)
+    # Threads share memory already, so only process pools use shared memory blocks.
+    blocks = None
+    if transport == "shared_memory" and isinstance(pool, futures.ProcessPoolExecutor):
+        blocks = _transport.Blocks()
+    sent = {}
+    max_pending = 2 * workers
+    chunks = iter(lambda: list(itertools.islice(iterator, chunksize)), [])
+    pending = deque() if ordered else set()
+    add = pending.append if ordered else pending.add
+
+    def submit(chunk):
+        message = None if blocks is None else blocks.send(chunk)
+        if message is None:
+            add(pool.submit(chunk_function, function, chunk))
+        else:
+            block, arguments = message
+            future = pool.submit(_transport.run_chunk, chunk_function, function, *arguments)
+            sent[future] = block
+            add(future)
+
+    try:
+        for chunk in itertools.islice(chunks, max_pending):
+            submit(chunk)
+
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                pending -= done
+            for future in done:
+                results = future.result()
+                if future in sent:
+                    results = blocks.receive(sent.pop(future), results)
+                # Refill before yielding so workers stay busy while the consumer handles the results.
+                for chunk in itertools.islice(chunks, 1):
+                    submit(chunk)
+                yield from results
+    finally:
+        for future in pending:
+            future.cancel()
+        if owned:
+            pool.shutdown(wait=True)
+        if blocks is not None:
+            blocks.close()
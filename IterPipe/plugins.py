@@ -0,0 +1,137 @@
+"""
+Lazy loading of IterPipe's optional modules, and chainable methods added by other packages.
+
+Importing IterPipe only imports the core pipeline. The modules behind the other stage families, and the NumPy,
+multiprocessing, asyncio and concurrent.futures backends they use, are imported the first time they are used.
+
+Other packages can add methods to IterPipe with register. The target may be given as a "module:attribute" string,
+so the module is only imported when the method is first used::
+
+    register("parse_json", "mylib.stages:parse_json")
+    IterPipe(lines).parse_json(strict=False)
+
+Installed packages can also declare methods as entry points::
+
+    [project.entry-points."iterpipe.stages"]
+    parse_json = "mylib.stages:parse_json"
+
+Entry points in the "iterpipe.stages" group are registered as stages, those in "iterpipe.methods" as methods, when
+load_entry_points is called. Looking them up costs more than importing IterPipe itself, so it is not done on
+import; templates call it when they are asked for an unknown method. IterPipe has no __getattr__ hook for this,
+as defining one slows down every attribute lookup on a pipeline.
+"""
+import functools
+import importlib
+
+
+ENTRY_POINT_GROUPS = {"iterpipe.stages": "stage", "iterpipe.methods": "method"}
+
+_PACKAGE = __name__.rpartition(".")[0]
+
+_entry_points_loaded = False
+
+
+class LazyModule:
+    """
+    Stand-in for a module of this package, imported on first attribute access.
+
+    The module then replaces the stand-in under alias in namespace, so later accesses are plain global lookups.
+    """
+
+    def __init__(self, name, namespace, alias=None):
+        self._name = name
+        self._namespace = namespace
+        self._alias = alias or name
+
+    def __getattr__(self, attribute):
+        module = importlib.import_module("." + self._name, _PACKAGE)
+        self._namespace[self._alias] = module
+        return getattr(module, attribute)
+
+    def __repr__(self):
+        return "<lazy module {package}.{name}>".format(package=_PACKAGE, name=self._name)
+
+
+def _resolve(target):
+    if not isinstance(target, str):
+        return target
+    module, _, attribute = target.partition(":")
+    return functools.reduce(getattr, attribute.split("."), importlib.import_module(module))
+
+
+def _method(name, function, kind):
+    if kind == "method":
+        return function
+
+    def method(self, *args, **kwargs):
+        build = functools.partial(function, **kwargs) if kwargs else function
+        return self._then(name, build, *args)
+
+    method.__name__ = method.__qualname__ = name
+    method.__doc__ = function.__doc__
+    return method
+
+
+class _Registered:
+    """
+    Class attribute standing in for a registered method until it is first looked up.
+    """
+
+    def __init__(self, name, target, kind):
+        self.name = name
+        self.target = target
+        self.kind = kind
+
+    def __get__(self, instance, owner):
+        method = _method(self.name, _resolve(self.target), self.kind)
+        setattr(owner, self.name, method)
+        return method if instance is None else method.__get__(instance, owner)
+
+
+def register(name, target, kind="stage"):
+    """
+    Add a chainable method called name to IterPipe.
+
+    :param target: The function, or a "module:attribute" string naming it, imported when the method is first used.
+    :param kind: "stage" if target(iterator, *args, **kwargs) returns the downstream iterator; the method then
+        records a stage in the lazy plan and returns a new IterPipe. "method" if target(pipe, *args, **kwargs) is
+        itself the method, for example a terminal.
+    """
+    from .IterPipe import IterPipe
+
+    if kind not in ("stage", "method"):
+        raise ValueError("kind must be 'stage' or 'method', not {kind!r}".format(kind=kind))
+    if name.startswith("_") or not name.isidentifier():
+        raise ValueError("{name!r} is not a valid method name".format(name=name))
+    if name in vars(IterPipe) and not isinstance(vars(IterPipe)[name], _Registered):
+        raise ValueError("IterPipe already has a {name} method".format(name=name))
+    setattr(IterPipe, name, _Registered(name, target, kind))
+
+
+def _entry_points(group):
+    from importlib import metadata
+
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, "select"):
+        return entry_points.select(group=group)
+    return entry_points.get(group, ())
+
+
+def load_entry_points():
+    """
+    Register the methods declared as entry points by installed packages, once.
+
+    :return: True if this call looked the entry points up, False if they were already loaded.
+    :rtype: bool
+    """
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return False
+    _entry_points_loaded = True
+    from .IterPipe import IterPipe
+
+    for group, kind in ENTRY_POINT_GROUPS.items():
+        for entry_point in _entry_points(group):
+            if entry_point.name not in vars(IterPipe):
+                register(entry_point.name, entry_point.value, kind)
+    return True
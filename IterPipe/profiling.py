@@ -0,0 +1,88 @@
+from collections import namedtuple
+from collections.abc import Iterator
+import time
+
+
+# Times are in seconds and exclude the time spent waiting on the upstream stage, which is reported separately as
+# upstream_time. selectivity is items_out / items_in, or None if no items went in.
+StageReport = namedtuple("StageReport", ["name", "items_in", "items_out", "selectivity", "wall_time", "cpu_time",
+                                         "upstream_time"])
+
+
+class Probe(Iterator):
+    """
+    Iterator that builds one stage on first use and records its item count and cumulative time.
+
+    Times include the upstream stage, since its next() is called from within this one.
+    """
+
+    def __init__(self, name, build, args, upstream):
+        self.name = name
+        self.upstream_probe = upstream if isinstance(upstream, Probe) else None
+        self.items = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.on_exhausted = None
+        self._build = build
+        self._args = args
+        self._upstream = upstream
+        self._iterator = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        exhausted = False
+        try:
+            iterator = self._iterator
+            if iterator is None:
+                iterator = self._iterator = self._build(self._upstream, *self._args)
+            item = next(iterator)
+        except StopIteration:
+            exhausted = True
+            raise
+        finally:
+            self.wall_time += time.perf_counter() - wall
+            self.cpu_time += time.process_time() - cpu
+            if exhausted and self.on_exhausted is not None:
+                on_exhausted, self.on_exhausted = self.on_exhausted, None
+                on_exhausted()
+        self.items += 1
+        return item
+
+    def report(self):
+        """
+        :rtype: StageReport
+        """
+        upstream = self.upstream_probe
+        if upstream is None:
+            return StageReport(self.name, None, self.items, None, self.wall_time, self.cpu_time, 0.0)
+        selectivity = self.items / upstream.items if upstream.items else None
+        return StageReport(self.name, upstream.items, self.items, selectivity, self.wall_time - upstream.wall_time,
+                           self.cpu_time - upstream.cpu_time, upstream.wall_time)
+
+
+def build(source, stages, callback=None):
+    """
+    Build the stages over the source with a probe around the source and around each stage.
+
+    :param callback: Called with the report, a tuple of StageReport, when the pipeline is exhausted.
+    :return: (outermost iterator, probes)
+    """
+    probe = Probe("source", iter, (), source)
+    probes = [probe]
+    for stage in stages:
+        probe = Probe(stage.name, stage.build, stage.args, probe)
+        probes.append(probe)
+    if callback is not None:
+        probe.on_exhausted = lambda: callback(report(probes))
+    return probe, probes
+
+
+def report(probes):
+    """
+    :rtype: tuple
+    """
+    return tuple(probe.report() for probe in probes)
@@ -0,0 +1,308 @@
+"""
+Single-pass reducers for IterPipe.aggregate.
+
+A reducer has an ``update(item)`` method, called once per item, and a ``result()`` method returning the aggregate.
+All reducers here use memory that does not grow with the number of items, except Reduce when its function builds
+a growing value.
+"""
+from collections import namedtuple
+import hashlib
+import math
+import random
+import struct
+
+
+StatsResult = namedtuple("StatsResult", ["count", "sum", "min", "max", "mean", "variance", "stdev"])
+
+_MASK_64 = (1 << 64) - 1
+
+
+def mix64(value):
+    """
+    Spread the bits of an integer hash over 64 bits (splitmix64 finalizer).
+
+    Needed because hash() of a small int is the int itself.
+    """
+    z = value & _MASK_64
+    z = ((z ^ (z >> 30)) * 0xbf58476d1ce4e5b9) & _MASK_64
+    z = ((z ^ (z >> 27)) * 0x94d049bb133111eb) & _MASK_64
+    return z ^ (z >> 31)
+
+
+# Added to each 64-bit word folded into a hash, so that zero words still change it (splitmix64 increment).
+_GOLDEN_GAMMA = 0x9e3779b97f4a7c15
+
+
+def _hash_int(value):
+    z = 0 if value >= 0 else _GOLDEN_GAMMA
+    value = abs(value)
+    while True:
+        z = mix64(z + (value & _MASK_64) + _GOLDEN_GAMMA)
+        value >>= 64
+        if not value:
+            return z
+
+
+def _digest(data, person):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8, person=person).digest(), "little")
+
+
+def hash64(item):
+    """
+    Return a 64-bit hash of item for probabilistic sketches, without the collisions of hash().
+
+    hash() keeps collisions that mixing cannot undo: hash(-1) == hash(-2), and ints that are equal modulo 2 ** 61 - 1
+    hash alike, as do tuples of them. Ints, and floats equal to them, are hashed from their value; other floats from
+    their bits; str and bytes from a digest, which is the same in every process; tuples from their items. Other
+    items fall back to hash().
+    """
+    if isinstance(item, int):
+        return _hash_int(item)
+    if isinstance(item, float):
+        if item.is_integer():
+            return _hash_int(int(item))
+        return _hash_int(struct.unpack("<q", struct.pack("<d", item))[0])
+    if isinstance(item, str):
+        return _digest(item.encode("utf-8", "surrogatepass"), b"str")
+    if isinstance(item, bytes):
+        return _digest(item, b"bytes")
+    if isinstance(item, tuple):
+        z = _hash_int(len(item))
+        for element in item:
+            z = mix64(z + hash64(element))
+        return z
+    return mix64(hash(item))
+
+
+class Count:
+    """
+    Number of items.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def update(self, item):
+        self.count += 1
+
+    def result(self):
+        return self.count
+
+
+class Sum:
+    """
+    Sum of a start value (default: 0) plus the items.
+    """
+
+    def __init__(self, start=0):
+        self.total = start
+
+    def update(self, item):
+        self.total += item
+
+    def result(self):
+        return self.total
+
+
+class Min:
+    """
+    Smallest item, or default if there were no items.
+    """
+
+    def __init__(self, key=None, default=None):
+        self.key = key
+        self.value = default
+        self._best = None
+        self._empty = True
+
+    def _better(self, candidate, best):
+        return candidate < best
+
+    def update(self, item):
+        candidate = item if self.key is None else self.key(item)
+        if self._empty or self._better(candidate, self._best):
+            self._empty = False
+            self._best = candidate
+            self.value = item
+
+    def result(self):
+        return self.value
+
+
+class Max(Min):
+    """
+    Biggest item, or default if there were no items.
+    """
+
+    def _better(self, candidate, best):
+        return candidate > best
+
+
+class Reduce:
+    """
+    Fold the items with function(value, item), starting from initial.
+    """
+
+    def __init__(self, function, initial):
+        self.function = function
+        self.value = initial
+
+    def update(self, item):
+        self.value = self.function(self.value, item)
+
+    def result(self):
+        return self.value
+
+
+class Stats:
+    """
+    Count, sum, min, max, mean and sample variance of numbers, using Welford's online algorithm for the variance.
+
+    variance and stdev are None for fewer than two items; min, max and mean are None for no items.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, item):
+        self.count += 1
+        self.total += item
+        if self.count == 1:
+            self.min = self.max = item
+        elif item < self.min:
+            self.min = item
+        elif item > self.max:
+            self.max = item
+        delta = item - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (item - self._mean)
+
+    def result(self):
+        """
+        :rtype: StatsResult
+        """
+        mean = self._mean if self.count else None
+        variance = self._m2 / (self.count - 1) if self.count > 1 else None
+        stdev = math.sqrt(variance) if variance is not None else None
+        return StatsResult(self.count, self.total, self.min, self.max, mean, variance, stdev)
+
+
+class Mean(Stats):
+    """
+    Arithmetic mean of numbers, or None if there were no items.
+    """
+
+    def result(self):
+        return self._mean if self.count else None
+
+
+class Quantiles:
+    """
+    Approximate quantiles with a KLL sketch.
+
+    Memory is O(k log(n / k)) items. The rank error is roughly 1.7 / k of the number of items; inputs of fewer than k
+    items are exact. Items must be comparable with each other.
+
+    :param quantiles: Fractions between 0 and 1, e.g. (0.5, 0.99).
+    :param k: Size of the largest compactor; larger is more accurate.
+    :param seed: Seed for the random choices made when compacting, for reproducible results.
+    """
+
+    def __init__(self, quantiles=(0.5,), k=200, seed=None):
+        if k < 2:
+            raise ValueError("k must be at least 2")
+        for quantile in quantiles:
+            if not 0 <= quantile <= 1:
+                raise ValueError("quantiles must be between 0 and 1")
+        self.quantiles = tuple(quantiles)
+        self.k = k
+        self.count = 0
+        self._random = random.Random(seed)
+        self._levels = [[]]
+        self._size = 0
+        self._max_size = self._capacity(0)
+
+    def _capacity(self, level):
+        depth = len(self._levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, item):
+        self.count += 1
+        self._levels[0].append(item)
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def _compress(self):
+        for level, items in enumerate(self._levels):
+            if len(items) >= self._capacity(level):
+                if level + 1 == len(self._levels):
+                    self._levels.append([])
+                items.sort()
+                kept = items[self._random.randint(0, 1)::2]
+                self._levels[level + 1].extend(kept)
+                self._size += len(kept) - len(items)
+                items.clear()
+                break
+        self._max_size = sum(self._capacity(level) for level in range(len(self._levels)))
+
+    def result(self):
+        """
+        Return the approximate value at each requested quantile, or None for each if there were no items.
+
+        :rtype: tuple
+        """
+        weighted = sorted((item, 1 << level) for level, items in enumerate(self._levels) for item in items)
+        if not weighted:
+            return tuple(None for _ in self.quantiles)
+        total = sum(weight for _, weight in weighted)
+        results = []
+        for quantile in self.quantiles:
+            target = quantile * total
+            cumulative = 0
+            for item, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    break
+            results.append(item)
+        return tuple(results)
+
+
+class Distinct:
+    """
+    Approximate number of distinct items with HyperLogLog.
+
+    Uses 2 ** precision bytes of memory; the standard error is about 1.04 / sqrt(2 ** precision), 0.8% for the default
+    precision of 14. Items must be hashable, and are hashed with hash64.
+    """
+
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self._registers = bytearray(1 << precision)
+        self._rest_bits = 64 - precision
+
+    def update(self, item):
+        z = hash64(item)
+        index = z >> self._rest_bits
+        rank = self._rest_bits - (z & ((1 << self._rest_bits) - 1)).bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def result(self):
+        """
+        :rtype: int
+        """
+        m = len(self._registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self._registers)
+        zeros = self._registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
@@ -0,0 +1,143 @@
+"""
+Hash-partitioned execution of a sub-chain of stages on worker processes. See IterPipe.partition_by.
+
+A feeder thread in the consumer pulls the upstream items, sends each to the worker of its partition in batches,
+and each worker runs the sub-chain over the items of its partition. Their outputs are sent back in batches.
+"""
+import itertools
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import traceback
+
+from .flow import _POLL_INTERVAL, _Failure, _put
+
+
+BATCH_SIZE = 256
+
+# Batches buffered per worker before the feeder waits for the worker to catch up.
+_QUEUE_BATCHES = 8
+
+
+class RemoteTraceback(Exception):
+    """
+    Traceback of an error raised in a partition worker, attached as the ``__cause__`` of the error.
+    """
+
+    def __str__(self):
+        return self.args[0]
+
+
+def _remote_failure(error):
+    """
+    Return a _Failure for an error raised in a worker that can be sent back to the consumer.
+    """
+    formatted = "".join(traceback.format_exception(type(error), error, error.__traceback__))
+    try:
+        pickle.dumps(error)
+    except Exception:
+        error = RuntimeError(repr(error))
+    return _Failure(error, formatted)
+
+
+def _worker(stages, inbox, outbox, index, batch_size):
+    try:
+        iterator = itertools.chain.from_iterable(iter(inbox.get, None))
+        for stage in stages:
+            iterator = stage.build(iterator, *stage.args)
+        for batch in iter(lambda: list(itertools.islice(iterator, batch_size)), []):
+            outbox.put((index, batch))
+    except BaseException as error:
+        outbox.put((index, _remote_failure(error)))
+    else:
+        outbox.put((index, None))
+
+
+def _feed(iterator, key, inboxes, batch_size, stop, errors):
+    n = len(inboxes)
+    buffers = [[] for _ in range(n)]
+    try:
+        for item in iterator:
+            index = hash(item if key is None else key(item)) % n
+            buffer = buffers[index]
+            buffer.append(item)
+            if len(buffer) >= batch_size:
+                if not _put(inboxes[index], stop, buffer):
+                    return
+                buffers[index] = []
+        for inbox, buffer in zip(inboxes, buffers):
+            if buffer and not _put(inbox, stop, buffer):
+                return
+    except BaseException as error:
+        errors.append(error)
+    finally:
+        for inbox in inboxes:
+            _put(inbox, stop, None)
+
+
+def gather(iterator, key, n, stages, ordered, batch_size=BATCH_SIZE):
+    """
+    Run the stages on n worker processes over the items of the iterator partitioned by hash(key(item)) % n, and
+    yield their outputs.
+
+    :param ordered: Yield the output of partition 0, then of partition 1 and so on, holding back the output of later
+        partitions in memory. Otherwise yield outputs as soon as they arrive.
+    """
+    n = n or os.cpu_count() or 1
+    if n < 1:
+        raise ValueError("the number of partitions must be at least 1")
+    context = multiprocessing.get_context()
+    inboxes = [context.Queue(_QUEUE_BATCHES) for _ in range(n)]
+    outbox = context.Queue()
+    workers = [context.Process(target=_worker, args=(stages, inboxes[index], outbox, index, batch_size), daemon=True)
+               for index in range(n)]
+    for worker in workers:
+        worker.start()
+    stop = threading.Event()
+    errors = []
+    feeder = threading.Thread(target=_feed, args=(iterator, key, inboxes, batch_size, stop, errors), daemon=True)
+    feeder.start()
+
+    pending = set(range(n))
+    held = [[] for _ in range(n)]
+    current = 0
+    try:
+        while pending:
+            try:
+                index, batch = outbox.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                if errors:
+                    raise errors[0]
+                for index in pending:
+                    if workers[index].exitcode:
+                        raise RuntimeError("partition worker {index} exited with code {code}"
+                                           .format(index=index, code=workers[index].exitcode))
+                continue
+            if type(batch) is _Failure:
+                raise batch.error from RemoteTraceback(batch.traceback)
+            if batch is None:
+                pending.discard(index)
+            elif not ordered or index == current:
+                yield from batch
+            else:
+                held[index].append(batch)
+            while ordered and current < n and current not in pending:
+                current += 1
+                if current < n:
+                    for batch in held[current]:
+                        yield from batch
+                    held[current] = None
+        feeder.join()
+        if errors:
+            raise errors[0]
+    finally:
+        stop.set()
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+        for channel in inboxes + [outbox]:
+            channel.cancel_join_thread()
+            channel.close()
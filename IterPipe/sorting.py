@@ -0,0 +1,64 @@
+import heapq
+import itertools
+import pickle
+import tempfile
+
+
+DEFAULT_MAX_MEMORY_ITEMS = 1000000
+
+# Items are pickled in blocks of this size to keep per-item serialisation overhead low.
+_RUN_BLOCK_SIZE = 1024
+
+
+def _write_run(items, tmp_dir):
+    file = tempfile.TemporaryFile(dir=tmp_dir)
+    for start in range(0, len(items), _RUN_BLOCK_SIZE):
+        pickle.dump(items[start:start + _RUN_BLOCK_SIZE], file, pickle.HIGHEST_PROTOCOL)
+    file.seek(0)
+    return file
+
+
+def _read_run(file):
+    while True:
+        try:
+            block = pickle.load(file)
+        except EOFError:
+            return
+        yield from block
+
+
+def external_sorted(iterator, key=None, reverse=False, max_memory_items=DEFAULT_MAX_MEMORY_ITEMS, tmp_dir=None):
+    """
+    Sort the items of the iterator holding at most max_memory_items of them in memory at a time.
+
+    Sorted runs of max_memory_items items are written to temporary files in tmp_dir and lazily merged with
+    heapq.merge. If the input fits in a single run it is sorted in memory and nothing is written.
+    """
+    if max_memory_items < 1:
+        raise ValueError("max_memory_items must be at least 1")
+    runs = []
+    try:
+        while True:
+            items = list(itertools.islice(iterator, max_memory_items))
+            items.sort(key=key, reverse=reverse)
+            if not runs and len(items) < max_memory_items:
+                yield from items
+                return
+            if items:
+                runs.append(_write_run(items, tmp_dir))
+            if len(items) < max_memory_items:
+                break
+            del items
+        yield from heapq.merge(*map(_read_run, runs), key=key, reverse=reverse)
+    finally:
+        for run in runs:
+            run.close()
+
+
+def top_k(iterator, k, key=None, reverse=False):
+    """
+    Return the first k items of sorted(iterator, key=key, reverse=reverse) using O(k) memory.
+    """
+    if reverse:
+        return heapq.nlargest(k, iterator, key=key)
+    return heapq.nsmallest(k, iterator, key=key)
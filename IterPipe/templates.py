@@ -0,0 +1,112 @@
+"""
+Pipeline templates: plans recorded once without a source and run over many sources.
+
+Each chained call on a template is applied once, to a pipeline over a placeholder source, which records its stage.
+A call that needs the items, or that does not return a pipeline, is the template's terminal. Running a template
+copies the recorded plan onto the given source and calls the terminal, if any, so no stage is built per run.
+Reducer instances among the terminal's arguments are copied for each run, so they start afresh; other arguments are
+passed as they are.
+"""
+import copy
+
+from . import plugins
+
+
+def _stateful(argument):
+    """
+    Return whether argument is a reducer instance, which keeps state between updates.
+    """
+    return not isinstance(argument, type) and hasattr(argument, "update") and hasattr(argument, "result")
+
+
+def _fresh(argument):
+    return copy.deepcopy(argument) if _stateful(argument) else argument
+
+
+class _SourceNeeded(Exception):
+    pass
+
+
+class _Placeholder:
+    """
+    Source of a template's pipeline, raising _SourceNeeded as soon as it is iterated.
+    """
+
+    def __iter__(self):
+        raise _SourceNeeded()
+
+
+PLACEHOLDER = _Placeholder()
+
+
+class Template:
+    """
+    Reusable pipeline plan. Call it with a source to run the plan over that source.
+    """
+
+    __slots__ = ("_pipe", "_terminal")
+
+    def __init__(self, pipe, terminal=None):
+        self._pipe = pipe
+        # (unbound method, args, kwargs, whether any argument is stateful) of the terminal call, or None if running the
+        # template returns a pipeline.
+        self._terminal = terminal
+
+    @property
+    def stages(self):
+        """
+        Stages recorded in the template's plan, in execution order.
+
+        :rtype: tuple
+        """
+        return self._pipe.stages
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            method = getattr(type(self._pipe), name)
+        except AttributeError:
+            # Methods declared as entry points are only registered once an unknown attribute is looked up.
+            if not plugins.load_entry_points():
+                raise
+            method = getattr(type(self._pipe), name)
+        if not callable(method):
+            raise AttributeError("{name} is not a chainable method".format(name=name))
+        if self._terminal is not None:
+            raise TypeError("cannot chain {name} after the terminal {terminal} of a template"
+                            .format(name=name, terminal=self._terminal[0].__name__))
+
+        def record(*args, **kwargs):
+            try:
+                result = method(self._pipe._with_source(PLACEHOLDER), *args, **kwargs)
+            except _SourceNeeded:
+                result = None
+            if type(result) is type(self._pipe) and result._iterator is None and result._source is PLACEHOLDER:
+                return Template(result)
+            stateful = any(map(_stateful, args)) or any(map(_stateful, kwargs.values()))
+            return Template(self._pipe, (method, args, kwargs, stateful))
+
+        return record
+
+    def __call__(self, source):
+        """
+        Run the template over source: return the pipeline, or the result of the terminal call.
+        """
+        pipe = self._pipe._with_source(source)
+        terminal = self._terminal
+        if terminal is None:
+            return pipe
+        method, args, kwargs, stateful = terminal
+        if stateful:
+            args = tuple(map(_fresh, args))
+            kwargs = {name: _fresh(argument) for name, argument in kwargs.items()}
+        return method(pipe, *args, **kwargs)
+
+    def map_over(self, sources):
+        """
+        Lazily run the template over each of the sources.
+
+        :rtype: IterPipe
+        """
+        return type(self._pipe)(map(self, sources))
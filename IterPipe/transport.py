@@ -0,0 +1,196 @@
+"""
+Shared-memory transport of chunks between a pipeline and its process pool workers.
+
+A chunk of bytes, array.array or NumPy arrays, all of one type, is copied into a shared memory block
+and only the name and layout of the block are pickled. The worker copies the items out, runs the chunk function,
+and writes the results back into the same block when they are of a supported type and fit. Other chunks and
+results are pickled as usual. Blocks are reused for later chunks, so in steady state there is one block per chunk
+in flight. Chunks of ints and floats are not worth it: pickling them is as cheap as copying them into a block.
+"""
+from array import array
+import math
+from multiprocessing import resource_tracker, shared_memory
+import sys
+
+
+# Smallest block created, in bytes. Blocks grow to the next power of two when a chunk does not fit.
+MIN_BLOCK_SIZE = 1 << 16
+
+# Typecode of the item lengths stored ahead of bytes and array.array items.
+_LENGTH = "q"
+
+
+def _write_parts(parts):
+    def write(buffer):
+        offset = 0
+        for part in parts:
+            with memoryview(part) as view, view.cast("B") as data:
+                buffer[offset:offset + data.nbytes] = data
+                offset += data.nbytes
+    return write
+
+
+def _write_ndarrays(numpy, items, dtype, shape):
+    def write(buffer):
+        target = numpy.ndarray((len(items),) + shape, dtype, buffer=buffer)
+        for index, item in enumerate(items):
+            target[index] = item
+        del target
+    return write
+
+
+def encode(items):
+    """
+    Return (kind, layout, size, write) for a list of items of one supported type, or None.
+
+    write(buffer) copies the items into the first size bytes of buffer; kind and layout are what decode needs.
+    """
+    if not items:
+        return None
+    types = set(map(type, items))
+    if len(types) != 1:
+        return None
+    item_type = types.pop()
+    # Items can only be NumPy arrays if NumPy was imported already.
+    numpy = sys.modules.get("numpy")
+    if item_type is bytes or item_type is array:
+        if item_type is array:
+            typecodes = {item.typecode for item in items}
+            if len(typecodes) != 1:
+                return None
+            layout = (typecodes.pop(), len(items))
+        else:
+            layout = (None, len(items))
+        lengths = array(_LENGTH, map(len, items))
+        data = b"".join(items)
+        return item_type.__name__, layout, len(lengths) * lengths.itemsize + len(data), _write_parts([lengths, data])
+    if numpy is not None and item_type is numpy.ndarray:
+        dtype = items[0].dtype
+        shape = items[0].shape
+        if dtype.hasobject or not shape or any(item.dtype != dtype or item.shape != shape for item in items):
+            return None
+        size = len(items) * math.prod(shape) * dtype.itemsize
+        # The dtype itself is pickled, as dtype.str loses the fields of structured dtypes.
+        return "ndarray", (dtype, shape, len(items)), size, _write_ndarrays(numpy, items, dtype, shape)
+    return None
+
+
+def decode(buffer, kind, layout):
+    """
+    Return the list of items that encode wrote into buffer, copied out of it.
+
+    :rtype: list
+    """
+    if kind == "bytes" or kind == "array":
+        typecode, count = layout
+        with buffer[:count * 8] as data, data.cast(_LENGTH) as view:
+            lengths = view.tolist()
+        offset = count * 8
+        items = []
+        if kind == "bytes":
+            for length in lengths:
+                items.append(bytes(buffer[offset:offset + length]))
+                offset += length
+        else:
+            itemsize = array(typecode).itemsize
+            for length in lengths:
+                item = array(typecode)
+                with buffer[offset:offset + length * itemsize] as data:
+                    item.frombytes(data)
+                items.append(item)
+                offset += length * itemsize
+        return items
+    import numpy
+
+    dtype, shape, count = layout
+    block = numpy.frombuffer(buffer, dtype, count * math.prod(shape)).reshape((count,) + shape).copy()
+    return list(block)
+
+
+def _attach(name):
+    """
+    Attach to a block owned by the consumer without registering it with the resource tracker.
+
+    Workers share the consumer's tracker, or start their own. Before Python 3.13, SharedMemory registers every block
+    it attaches to, so the tracker would either unlink the block when the worker exits, or keep a registration that
+    outlives the consumer's unlink and warn about a leaked or missing block at shutdown.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = _skip_register
+    try:
+        return shared_memory.SharedMemory(name)
+    finally:
+        resource_tracker.register = register
+
+
+def _skip_register(name, rtype):
+    pass
+
+
+def run_chunk(chunk_function, function, name, kind, layout):
+    """
+    Worker side: run chunk_function(function, items) on the items in the shared memory block called name.
+
+    Return (kind, layout) if the results were written back into the block, otherwise (None, results).
+    """
+    block = _attach(name)
+    try:
+        results = chunk_function(function, decode(block.buf, kind, layout))
+        encoded = encode(results)
+        if encoded is not None and encoded[2] <= block.size:
+            kind, layout, _, write = encoded
+            write(block.buf)
+            return kind, layout
+        return None, results
+    finally:
+        block.close()
+
+
+class Blocks:
+    """
+    Shared memory blocks owned by the consumer, reused between chunks.
+    """
+
+    def __init__(self):
+        self.free = []
+        self.all = []
+
+    def send(self, chunk):
+        """
+        Copy the chunk into a free block and return (block, run_chunk arguments after function), or None if the
+        chunk has to be pickled.
+        """
+        encoded = encode(chunk)
+        if encoded is None:
+            return None
+        kind, layout, size, write = encoded
+        for index, block in enumerate(self.free):
+            if block.size >= size:
+                del self.free[index]
+                break
+        else:
+            block = shared_memory.SharedMemory(create=True, size=max(MIN_BLOCK_SIZE, 1 << (size - 1).bit_length()))
+            self.all.append(block)
+        write(block.buf)
+        return block, (block.name, kind, layout)
+
+    def receive(self, block, reply):
+        """
+        Return the results of a chunk sent in block, and make the block free again.
+
+        :rtype: list
+        """
+        kind, results = reply
+        if kind is not None:
+            results = decode(block.buf, kind, results)
+        self.free.append(block)
+        return results
+
+    def close(self):
+        for block in self.all:
+            block.close()
+            block.unlink()
+        self.all = []
+        self.free = []
@@ -0,0 +1,268 @@
+"""
+Block-wise NumPy execution of numeric pipelines.
+
+A plan that starts with IterPipe.vectorized() over a range, array.array or one-dimensional NumPy array runs its
+leading map, filter, filterfalse and accumulate stages on fixed-size NumPy blocks instead of on boxed Python objects.
+NumPy ufuncs are applied to whole blocks. Other functions are called with a whole block too, and the result is
+checked against per-element calls on a few items of the block; if the call raises, does not return an array of the
+right shape, or does not match, the stage stops vectorizing. From that block on, it and the stages after it run
+element-wise on blocks of Python objects, so they see and return exactly what an element-wise run would. Functions
+must therefore be pure.
+
+NumPy integers wrap around where Python ints grow. On integer blocks, functions are also called with the block
+converted to floats, and a stage whose integer results do not match stops vectorizing; sums and accumulations fall
+back to Python ints when their bounds could overflow; and ranges outside the int64 bounds are not vectorized.
+
+NumPy is optional. Without it every plan runs element-wise.
+"""
+import array
+import itertools
+import math
+import operator
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+DEFAULT_BLOCK_SIZE = 65536
+
+_INT64 = numpy.iinfo(numpy.int64) if numpy is not None else None
+
+_ACCUMULATE_UFUNCS = {
+    operator.add: "add",
+    operator.mul: "multiply",
+    max: "maximum",
+    min: "minimum",
+}
+
+
+def _source_blocks(source, block_size):
+    """
+    Return an iterator of NumPy blocks over the source, or None if the source is not supported.
+    """
+    if isinstance(source, range):
+        if source and not (_INT64.min <= min(source[0], source[-1]) and max(source[0], source[-1]) <= _INT64.max):
+            return None
+        return (numpy.arange(part.start, part.stop, part.step)
+                for part in (source[i:i + block_size] for i in range(0, len(source), block_size)))
+    if isinstance(source, array.array):
+        if source.typecode == "u":
+            return None
+        source = numpy.frombuffer(source, dtype=numpy.dtype(source.typecode))
+    if isinstance(source, numpy.ndarray) and source.ndim == 1:
+        return (source[i:i + block_size] for i in range(0, len(source), block_size))
+    return None
+
+
+# Number of items of a block that are checked against per-element calls.
+SAMPLE_SIZE = 4
+
+
+def _sample(block):
+    return block[::max(1, len(block) // SAMPLE_SIZE)].tolist()
+
+
+def _same(expected, results):
+    return all(type(item) is type(result) and item == result for item, result in zip(expected, results))
+
+
+def _integer(block):
+    return block.dtype.kind in "iu"
+
+
+def _estimate(function, block):
+    """
+    Return function applied to the integer block converted to floats, which do not wrap around, or None.
+    """
+    try:
+        estimate = function(block.astype(numpy.float64))
+    except Exception:
+        return None
+    return estimate if isinstance(estimate, numpy.ndarray) and estimate.shape == block.shape else None
+
+
+def _exact(function, block, result):
+    """
+    Return whether the result of function(block) did not wrap around.
+    """
+    if not (_integer(block) and _integer(result)):
+        return True
+    estimate = _estimate(function, block)
+    if estimate is None:
+        return False
+    # Floats round results beyond 2**53, so those only have to be close.
+    return bool((result == estimate).all()) or bool(numpy.allclose(result, estimate, rtol=1e-9, atol=0))
+
+
+def _map_blocks(blocks, function):
+    trusted = isinstance(function, numpy.ufunc)
+    vectorized = True
+    for block in blocks:
+        if vectorized and isinstance(block, numpy.ndarray):
+            try:
+                result = function(block)
+            except Exception:
+                result = None
+            if (isinstance(result, numpy.ndarray) and result.shape == block.shape
+                    and (trusted or _same(list(map(function, _sample(block))), _sample(result)))
+                    and _exact(function, block, result)):
+                yield result
+                continue
+            vectorized = False
+        if isinstance(block, numpy.ndarray):
+            block = block.tolist()
+        yield [function(item) for item in block]
+
+
+def _mask_blocks(blocks, predicate, keep):
+    vectorized = predicate is not None
+    for block in blocks:
+        if not isinstance(block, numpy.ndarray):
+            block = [item for item in block if bool(item if predicate is None else predicate(item)) is keep]
+            if block:
+                yield block
+            continue
+        mask = None
+        if predicate is None:
+            mask = block.astype(bool)
+        elif vectorized:
+            try:
+                mask = predicate(block)
+            except Exception:
+                mask = None
+            if not (isinstance(mask, numpy.ndarray) and mask.shape == block.shape and _same(
+                    [bool(predicate(item)) for item in _sample(block)], _sample(mask.astype(bool)))):
+                vectorized = False
+                mask = None
+            elif _integer(block):
+                estimate = _estimate(predicate, block)
+                if estimate is None or not numpy.array_equal(mask.astype(bool), estimate.astype(bool)):
+                    vectorized = False
+                    mask = None
+        if mask is None:
+            mask = numpy.fromiter(map(predicate, block.tolist()), dtype=bool, count=len(block))
+        else:
+            mask = mask.astype(bool)
+        block = block[mask if keep else ~mask]
+        if len(block):
+            yield block
+
+
+def _magnitude(block):
+    """
+    Return the largest magnitude of the items of the integer block, as a Python int.
+    """
+    return max(abs(block.min().item()), abs(block.max().item()))
+
+
+def _bits(block):
+    """
+    Return an upper bound of log2 of the product of the magnitudes of the items of the block.
+    """
+    return float(numpy.log2(numpy.maximum(numpy.abs(block.astype(numpy.float64)), 1)).sum())
+
+
+def _bounded(ufunc, block, carry):
+    """
+    Return whether accumulating the integer block with ufunc, starting from carry, stays within its dtype.
+    """
+    if not _integer(block) or ufunc is numpy.maximum or ufunc is numpy.minimum:
+        return True
+    limit = numpy.iinfo(block.dtype).max
+    carry = 0 if carry is None else abs(carry.item())
+    if ufunc is numpy.add:
+        return _magnitude(block) * len(block) + carry <= limit
+    return _bits(block) + math.log2(max(carry, 1)) < math.log2(limit)
+
+
+def _accumulate_blocks(blocks, function, ufunc):
+    carry = None
+    vectorized = True
+    for block in blocks:
+        if not len(block):
+            continue
+        if isinstance(block, numpy.ndarray) and vectorized and _bounded(ufunc, block, carry):
+            block = ufunc.accumulate(block)
+            if carry is not None:
+                block = ufunc(block, carry)
+            carry = block[-1]
+        else:
+            # Python ints from here on, as carry may no longer fit the blocks' dtype.
+            vectorized = False
+            block = _tolist(block)
+            if isinstance(carry, numpy.generic):
+                carry = carry.item()
+            if carry is None:
+                block = list(itertools.accumulate(block, function))
+            else:
+                block = list(itertools.accumulate(block, function, initial=carry))[1:]
+            carry = block[-1]
+        yield block
+
+
+def blocks(source, stages):
+    """
+    Run the leading vectorizable stages of a plan that starts with a vectorized stage.
+
+    :param source: The pipeline source.
+    :param stages: The plan, starting with the vectorized stage.
+    :return: (blocks, remaining stages), where blocks is an iterator of NumPy arrays and, once a stage has stopped
+        vectorizing, lists of Python objects; or None if the plan cannot be vectorized.
+    :rtype: tuple
+    """
+    if numpy is None:
+        return None, stages[1:]
+    (block_size,) = stages[0].args
+    source_blocks = _source_blocks(source, block_size)
+    if source_blocks is None:
+        return None, stages[1:]
+
+    for index, stage in enumerate(stages[1:], 1):
+        if stage.name == "map":
+            source_blocks = _map_blocks(source_blocks, *stage.args)
+        elif stage.name == "filter":
+            source_blocks = _mask_blocks(source_blocks, stage.args[0], True)
+        elif stage.name == "filterfalse":
+            source_blocks = _mask_blocks(source_blocks, stage.args[0], False)
+        elif stage.name == "accumulate" and stage.args[0] in _ACCUMULATE_UFUNCS:
+            function = stage.args[0]
+            source_blocks = _accumulate_blocks(source_blocks, function, getattr(numpy, _ACCUMULATE_UFUNCS[function]))
+        else:
+            return source_blocks, stages[index:]
+    return source_blocks, ()
+
+
+def _tolist(block):
+    return block.tolist() if isinstance(block, numpy.ndarray) else block
+
+
+def unbox(blocks):
+    """
+    Return an iterator over the items of the blocks as Python objects.
+    """
+    return itertools.chain.from_iterable(map(_tolist, blocks))
+
+
+def _sum(block):
+    if not isinstance(block, numpy.ndarray):
+        return sum(block)
+    if _integer(block) and _magnitude(block) * len(block) > _INT64.max:
+        # The NumPy sum could wrap around.
+        return sum(block.tolist())
+    return block.sum().item()
+
+
+def sum_blocks(blocks, start=0):
+    return start + sum(map(_sum, blocks))
+
+
+def max_blocks(blocks, **kwargs):
+    return max((block.max().item() if isinstance(block, numpy.ndarray) else max(block)
+                for block in blocks if len(block)), **kwargs)
+
+
+def min_blocks(blocks, **kwargs):
+    return min((block.min().item() if isinstance(block, numpy.ndarray) else min(block)
+                for block in blocks if len(block)), **kwargs)
@@ -0,0 +1,111 @@
+from collections import deque
+import itertools
+
+
+def sliding(iterator, n, step=1):
+    """
+    Yield tuples of n consecutive items, starting a new window every step items. Incomplete windows are not yielded.
+    """
+    if n < 1 or step < 1:
+        raise ValueError("window size and step must be at least 1")
+    window = deque(itertools.islice(iterator, n), maxlen=n)
+    if len(window) < n:
+        return
+    yield tuple(window)
+    if step >= n:
+        # Windows do not overlap: skip the gap, then fill a whole new window.
+        while True:
+            for _ in itertools.islice(iterator, step - n):
+                pass
+            window = tuple(itertools.islice(iterator, n))
+            if len(window) < n:
+                return
+            yield window
+    append = window.append
+    while True:
+        added = 0
+        for item in itertools.islice(iterator, step):
+            append(item)
+            added += 1
+        if added < step:
+            return
+        yield tuple(window)
+
+
+def session(iterator, gap, key=None):
+    """
+    Yield lists of consecutive items whose keys are at most gap apart.
+    """
+    current = []
+    last = None
+    for item in iterator:
+        value = item if key is None else key(item)
+        if current and value - last > gap:
+            yield current
+            current = []
+        current.append(item)
+        last = value
+    if current:
+        yield current
+
+
+def rolling_sum(iterator, n):
+    """
+    Yield the sum of each window of n consecutive items, updating the running sum in O(1) per item.
+    """
+    if n < 1:
+        raise ValueError("window size must be at least 1")
+    window = deque()
+    total = 0
+    for item in iterator:
+        window.append(item)
+        total += item
+        if len(window) > n:
+            total -= window.popleft()
+        if len(window) == n:
+            yield total
+
+
+def rolling_mean(iterator, n):
+    """
+    Yield the mean of each window of n consecutive items.
+    """
+    for total in rolling_sum(iterator, n):
+        yield total / n
+
+
+def _rolling_extreme(iterator, n, replaces):
+    if n < 1:
+        raise ValueError("window size must be at least 1")
+    # Monotonic deque of (index, item): candidates for the extreme of the current or a later window.
+    candidates = deque()
+    for index, item in enumerate(iterator):
+        while candidates and replaces(item, candidates[-1][1]):
+            candidates.pop()
+        candidates.append((index, item))
+        if candidates[0][0] <= index - n:
+            candidates.popleft()
+        if index >= n - 1:
+            yield candidates[0][1]
+
+
+def _less_or_equal(item, other):
+    return item <= other
+
+
+def _greater_or_equal(item, other):
+    return item >= other
+
+
+def rolling_min(iterator, n):
+    """
+    Yield the minimum of each window of n consecutive items in amortized O(1) per item.
+    """
+    return _rolling_extreme(iterator, n, _less_or_equal)
+
+
+def rolling_max(iterator, n):
+    """
+    Yield the maximum of each window of n consecutive items in amortized O(1) per item.
+    """
+    return _rolling_extreme(iterator, n, _greater_or_equal)
@@ -0,0 +1,223 @@
+"""
+Benchmarks of IterPipe methods and chains against the equivalent builtin and itertools calls.
+
+Run the suite and save machine-readable results:
+
+    python benchmarks/bench_IterPipe.py run --sizes 1000 100000 --output new.json
+
+Compare two runs and exit with status 1 if any IterPipe timing got slower by more than the threshold:
+
+    python benchmarks/bench_IterPipe.py compare old.json new.json --threshold 1.2
+"""
+import argparse
+from collections import deque
+import functools
+import itertools
+import json
+import operator
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from IterPipe import IterPipe  # noqa: E402
+
+
+def consume(iterator):
+    deque(iterator, maxlen=0)
+
+
+def is_even(x):
+    return x % 2 == 0
+
+
+def is_small(x):
+    return x < 1000
+
+
+def square(x):
+    return x * x
+
+
+def add(x, y):
+    return x + y
+
+
+def pairs(data):
+    return [(x, x) for x in data]
+
+
+def small(data):
+    # Combinatoric methods grow much faster than their input; keep their input small.
+    return data[:min(len(data), 40)]
+
+
+# name -> (setup(data) returning the input, IterPipe implementation, baseline implementation)
+CASES = {
+    "accumulate": (list, lambda d: consume(IterPipe(d).accumulate()), lambda d: consume(itertools.accumulate(d))),
+    "all": (lambda d: [True] * len(d), lambda d: IterPipe(d).all(), all),
+    "any": (lambda d: [False] * len(d), lambda d: IterPipe(d).any(), any),
+    "chain": (list, lambda d: consume(IterPipe(d).chain(d)), lambda d: consume(itertools.chain(d, d))),
+    "combinations": (small, lambda d: consume(IterPipe(d).combinations(2)),
+                     lambda d: consume(itertools.combinations(d, 2))),
+    "combinations_with_replacement": (small, lambda d: consume(IterPipe(d).combinations_with_replacement(2)),
+                                      lambda d: consume(itertools.combinations_with_replacement(d, 2))),
+    "compress": (list, lambda d: consume(IterPipe(d).compress(d)), lambda d: consume(itertools.compress(d, d))),
+    "cycle": (list, lambda d: consume(IterPipe(d).cycle().islice(2 * len(d))),
+              lambda d: consume(itertools.islice(itertools.cycle(d), 2 * len(d)))),
+    "dict": (pairs, lambda d: IterPipe(d).dict(), dict),
+    "dropwhile": (list, lambda d: consume(IterPipe(d).dropwhile(is_small)),
+                  lambda d: consume(itertools.dropwhile(is_small, d))),
+    "enumerate": (list, lambda d: consume(IterPipe(d).enumerate()), lambda d: consume(enumerate(d))),
+    "filter": (list, lambda d: consume(IterPipe(d).filter(is_even)), lambda d: consume(filter(is_even, d))),
+    "filterfalse": (list, lambda d: consume(IterPipe(d).filterfalse(is_even)),
+                    lambda d: consume(itertools.filterfalse(is_even, d))),
+    "frozenset": (list, lambda d: IterPipe(d).frozenset(), frozenset),
+    "groupby": (list, lambda d: consume(IterPipe(d).groupby(is_small)),
+                lambda d: consume(itertools.groupby(d, is_small))),
+    "islice": (list, lambda d: consume(IterPipe(d).islice(0, None, 2)),
+               lambda d: consume(itertools.islice(d, 0, None, 2))),
+    "list": (list, lambda d: IterPipe(d).list(), list),
+    "map": (list, lambda d: consume(IterPipe(d).map(square)), lambda d: consume(map(square, d))),
+    "max": (list, lambda d: IterPipe(d).max(), max),
+    "min": (list, lambda d: IterPipe(d).min(), min),
+    "next": (list, lambda d: IterPipe(d).next(), lambda d: next(iter(d))),
+    "permutations": (small, lambda d: consume(IterPipe(d).permutations(2)),
+                     lambda d: consume(itertools.permutations(d, 2))),
+    "product": (small, lambda d: consume(IterPipe(d).product(d)), lambda d: consume(itertools.product(d, d))),
+    "reduce": (list, lambda d: IterPipe(d).reduce(add, 0), lambda d: functools.reduce(add, d, 0)),
+    "set": (list, lambda d: IterPipe(d).set(), set),
+    "sorted": (lambda d: d[::-1], lambda d: consume(IterPipe(d).sorted()), lambda d: consume(sorted(d))),
+    "starmap": (pairs, lambda d: consume(IterPipe(d).starmap(add)), lambda d: consume(itertools.starmap(add, d))),
+    "sum": (list, lambda d: IterPipe(d).sum(), sum),
+    "takewhile": (list, lambda d: consume(IterPipe(d).takewhile(is_small)),
+                  lambda d: consume(itertools.takewhile(is_small, d))),
+    "tee": (list, lambda d: [consume(branch) for branch in IterPipe(d).tee(2)],
+            lambda d: [consume(branch) for branch in itertools.tee(d, 2)]),
+    "tuple": (list, lambda d: IterPipe(d).tuple(), tuple),
+    "zip": (list, lambda d: consume(IterPipe(d).zip(d)), lambda d: consume(zip(d, d))),
+    "zip_longest": (list, lambda d: consume(IterPipe(d).zip_longest(d[1:])),
+                    lambda d: consume(itertools.zip_longest(d, d[1:]))),
+}
+
+
+def chain_case(depth):
+    """
+    Alternating map/filter chain of the given depth, summed.
+    """
+    def iterpipe(data):
+        pipe = IterPipe(data)
+        for level in range(depth):
+            pipe = pipe.map(operator.pos) if level % 2 == 0 else pipe.filter(None)
+        return pipe.sum()
+
+    def baseline(data):
+        iterator = data
+        for level in range(depth):
+            iterator = map(operator.pos, iterator) if level % 2 == 0 else filter(None, iterator)
+        return sum(iterator)
+
+    return list, iterpipe, baseline
+
+
+def measure(function, data, repeat, number):
+    seconds = min(timeit.repeat(lambda: function(data), repeat=repeat, number=number)) / number
+    tracemalloc.start()
+    try:
+        function(data)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def run(sizes, depths, repeat, names=None):
+    cases = dict(CASES)
+    for depth in depths:
+        cases["chain_depth_{depth}".format(depth=depth)] = chain_case(depth)
+    results = []
+    for name, (setup, iterpipe, baseline) in sorted(cases.items()):
+        if names and name not in names:
+            continue
+        for size in sizes:
+            data = setup(list(range(size)))
+            number = max(1, 100000 // max(size, 1))
+            iterpipe_seconds, iterpipe_peak = measure(iterpipe, data, repeat, number)
+            baseline_seconds, baseline_peak = measure(baseline, data, repeat, number)
+            results.append({
+                "name": name,
+                "size": size,
+                "iterpipe_seconds": iterpipe_seconds,
+                "baseline_seconds": baseline_seconds,
+                "ratio": iterpipe_seconds / baseline_seconds if baseline_seconds else None,
+                "iterpipe_peak_bytes": iterpipe_peak,
+                "baseline_peak_bytes": baseline_peak,
+            })
+            print("{name:<32} {size:>9} {ratio:>8.2f}x  {seconds:.3e}s".format(
+                name=name, size=size, ratio=results[-1]["ratio"] or 0.0, seconds=iterpipe_seconds), file=sys.stderr)
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(old, new, threshold):
+    """
+    Return (name, size, old seconds, new seconds) for every IterPipe timing slower by more than threshold.
+    """
+    old_results = {(result["name"], result["size"]): result for result in old["results"]}
+    regressions = []
+    for result in new["results"]:
+        previous = old_results.get((result["name"], result["size"]))
+        if previous is None:
+            continue
+        if result["iterpipe_seconds"] > previous["iterpipe_seconds"] * threshold:
+            regressions.append((result["name"], result["size"], previous["iterpipe_seconds"],
+                                result["iterpipe_seconds"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000, 1000000])
+    run_parser.add_argument("--depths", type=int, nargs="+", default=[1, 2, 5, 10, 20])
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--only", nargs="+", help="names of the benchmarks to run")
+    run_parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+
+    compare_parser = commands.add_parser("compare", help="compare two JSON results")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=1.2,
+                                help="flag timings slower than old * threshold (default: 1.2)")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        results = run(args.sizes, args.depths, args.repeat, args.only)
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(results, file, indent=2)
+        else:
+            json.dump(results, sys.stdout, indent=2)
+        return 0
+
+    with open(args.old) as file:
+        old = json.load(file)
+    with open(args.new) as file:
+        new = json.load(file)
+    regressions = compare(old, new, args.threshold)
+    for name, size, old_seconds, new_seconds in regressions:
+        print("REGRESSION {name} size={size}: {old:.3e}s -> {new:.3e}s ({ratio:.2f}x)".format(
+            name=name, size=size, old=old_seconds, new=new_seconds, ratio=new_seconds / old_seconds))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Throughput of par_map on a process pool with pickled chunks against shared memory chunks.
+
+Each record kind is passed through an identity function, so the time measured is the transport itself. Chunks of
+ints and floats are always pickled and are included as a reference:
+
+    python benchmarks/bench_transport.py --items 20000 --record-bytes 4096 --output transport.json
+"""
+import argparse
+from array import array
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from IterPipe import IterPipe  # noqa: E402
+from IterPipe.vectorized import numpy  # noqa: E402
+
+
+def identity(item):
+    return item
+
+
+def records(kind, items, record_bytes):
+    """
+    Return items records of the given kind, each of about record_bytes bytes.
+    """
+    if kind == "int":
+        return list(range(items))
+    if kind == "float":
+        return [float(index) for index in range(items)]
+    if kind == "bytes":
+        return [bytes([index % 256]) * record_bytes for index in range(items)]
+    if kind == "array":
+        return [array("d", [float(index)]) * (record_bytes // 8) for index in range(items)]
+    return [numpy.full(record_bytes // 8, index, dtype=numpy.float64) for index in range(items)]
+
+
+def measure(data, workers, chunksize, transport, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = (IterPipe(data)
+                 .par_map(identity, workers=workers, chunksize=chunksize, transport=transport)
+                 .aggregate_by(lambda item: 0, int, lambda total, item: total + 1)
+                 .dict())
+        seconds = time.perf_counter() - start
+        assert count == {0: len(data)}
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def run(kinds, items, record_bytes, workers, chunksize, repeat):
+    results = []
+    for kind in kinds:
+        if kind == "ndarray" and numpy is None:
+            continue
+        data = records(kind, items, record_bytes)
+        payload = record_bytes if kind in ("bytes", "array", "ndarray") else 8
+        pickle_seconds = measure(data, workers, chunksize, "pickle", repeat)
+        shared_seconds = measure(data, workers, chunksize, "shared_memory", repeat)
+        results.append({
+            "kind": kind,
+            "items": items,
+            "record_bytes": payload,
+            "pickle_items_per_second": items / pickle_seconds,
+            "shared_memory_items_per_second": items / shared_seconds,
+            "speedup": pickle_seconds / shared_seconds,
+        })
+        print("{kind:<8} pickle {pickle:>10.0f}/s  shared_memory {shared:>10.0f}/s  {speedup:.2f}x  ({mb:.0f} MB/s)"
+              .format(kind=kind, pickle=items / pickle_seconds, shared=items / shared_seconds,
+                      speedup=pickle_seconds / shared_seconds, mb=items * payload / shared_seconds / 1e6),
+              file=sys.stderr)
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "workers": workers,
+        "chunksize": chunksize,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kinds", nargs="+", default=["int", "float", "bytes", "array", "ndarray"])
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--record-bytes", type=int, default=4096)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = run(args.kinds, args.items, args.record_bytes, args.workers, args.chunksize, args.repeat)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
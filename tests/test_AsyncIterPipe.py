@@ -0,0 +1,133 @@
+import asyncio
+import unittest
+
+from IterPipe import AsyncIterPipe
+
+
+async def async_range(n):
+    for i in range(n):
+        yield i
+
+
+class test_AsyncIterpipe(unittest.IsolatedAsyncioTestCase):
+    async def test_roundtrip(self):
+        output = [item async for item in AsyncIterPipe(async_range(3))]
+        self.assertEqual(output, [0, 1, 2])
+
+    async def test_sync_source(self):
+        output = await (AsyncIterPipe([1, 2, 3])
+                        .list()
+                        )
+        self.assertEqual(output, [1, 2, 3])
+
+    async def test_chained_stages(self):
+        output = await (AsyncIterPipe(async_range(10))
+                        .filter(lambda x: x % 2 == 0)
+                        .map(lambda x: x * 10)
+                        .enumerate()
+                        .islice(1, 4)
+                        .list()
+                        )
+        self.assertEqual(output, [(1, 20), (2, 40), (3, 60)])
+
+        output = await (AsyncIterPipe(async_range(6))
+                        .dropwhile(lambda x: x < 2)
+                        .takewhile(lambda x: x < 5)
+                        .accumulate()
+                        .list()
+                        )
+        self.assertEqual(output, [2, 5, 9])
+
+        output = await (AsyncIterPipe(async_range(3))
+                        .chain(async_range(2))
+                        .zip("abcde")
+                        .batch(2)
+                        .unbatch()
+                        .dict()
+                        )
+        self.assertEqual(output, {0: "d", 1: "e", 2: "c"})
+
+    async def test_map_async(self):
+        in_flight = []
+        max_in_flight = []
+
+        async def enrich(x):
+            in_flight.append(x)
+            max_in_flight.append(len(in_flight))
+            await asyncio.sleep(0.01 * (5 - x))
+            in_flight.remove(x)
+            return x * 2
+
+        output_1 = await (AsyncIterPipe(async_range(5))
+                          .map_async(enrich, concurrency=3)
+                          .list()
+                          )
+        self.assertEqual(output_1, [0, 2, 4, 6, 8])
+        self.assertEqual(max(max_in_flight), 3)
+
+        # Each coroutine finishes only once the result of the one after it has been consumed
+        turns = [asyncio.Event() for _ in range(5)]
+
+        async def wait_turn(x):
+            await turns[x].wait()
+            return x * 2
+
+        def release(y):
+            if y:
+                turns[y // 2 - 1].set()
+            return y
+
+        turns[4].set()
+        output_2 = await (AsyncIterPipe(async_range(5))
+                          .map_async(wait_turn, concurrency=5, ordered=False)
+                          .map(release)
+                          .list()
+                          )
+        self.assertEqual(output_2, [8, 6, 4, 2, 0])
+
+    async def test_map_async_cancelled(self):
+        cancelled = []
+
+        async def wait_forever(x):
+            if x < 2:
+                return x
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.append(x)
+                raise
+
+        output_1 = await (AsyncIterPipe(async_range(5))
+                          .map_async(wait_forever, concurrency=5)
+                          .islice(2)
+                          .list()
+                          )
+        self.assertEqual(output_1, [0, 1])
+        output_2 = await (AsyncIterPipe(async_range(5))
+                          .map_async(wait_forever, concurrency=5)
+                          .takewhile(lambda x: x < 1)
+                          .list()
+                          )
+        self.assertEqual(output_2, [0])
+        self.assertTrue(await (AsyncIterPipe(async_range(5))
+                               .map_async(wait_forever, concurrency=5)
+                               .any()
+                               ))
+        for _ in range(3):
+            await asyncio.sleep(0)
+        self.assertEqual(sorted(cancelled), [2, 2, 2, 3, 3, 3, 4, 4, 4])
+
+    async def test_terminals(self):
+        self.assertEqual(await AsyncIterPipe(async_range(4)).sum(), 6)
+        self.assertEqual(await AsyncIterPipe(async_range(4)).reduce(lambda x, y: x + y, 0), 6)
+        self.assertEqual(await AsyncIterPipe(async_range(4)).max(), 3)
+        self.assertEqual(await AsyncIterPipe(async_range(4)).min(), 0)
+        self.assertEqual(await AsyncIterPipe(["bb", "a", "cc"]).max(key=len), "bb")
+        self.assertEqual(await AsyncIterPipe(["bb", "a", "cc"]).min(key=len), "a")
+        self.assertIsNone(await AsyncIterPipe([]).max(default=None))
+        with self.assertRaises(ValueError):
+            await AsyncIterPipe([]).min()
+        self.assertEqual(await AsyncIterPipe([1, 1]).set(), {1})
+        self.assertTrue(await AsyncIterPipe([1, 1]).all())
+        self.assertFalse(await AsyncIterPipe([0, 0]).any())
+        self.assertEqual(await AsyncIterPipe(async_range(4)).next(), 0)
@@ -1,6 +1,18 @@
+import array
+import collections.abc
+import functools
+import itertools
+import operator
+import os
+import struct
+import tempfile
+import time
 import unittest
 
-from IterPipe import IterPipe
+from IterPipe import Cache, IterPipe, commuting
+from IterPipe.checkpoint import FileCheckpointStore, MemoryCheckpointStore
+from IterPipe.reducers import Count, Max, Min, Sum
+from IterPipe.vectorized import numpy
 
 
 class test_Iterpipe(unittest.TestCase):
@@ -10,6 +22,47 @@ class test_Iterpipe(unittest.TestCase):
         output = list(IterPipe(input_iterable))
         self.assertEqual(input_iterable, output)
 
+    def test_lazy_plan(self):
+        consumed = []
+
+        def source():
+            for i in [1, 2, 3, 4]:
+                consumed.append(i)
+                yield i
+
+        iter_pipe = (IterPipe(source())
+                     .filter(lambda x: x % 2 == 0)
+                     .map(lambda x: x * 10)
+                     )
+        self.assertEqual([stage.name for stage in iter_pipe.stages], ["filter", "map"])
+        self.assertEqual(consumed, [])
+
+        self.assertEqual(iter_pipe.next(), 20)
+        self.assertEqual(consumed, [1, 2])
+
+        # Chaining onto a started pipeline continues from where it stopped
+        output = list(iter_pipe.map(lambda x: x + 1))
+        self.assertEqual(output, [41])
+
+    def test_iteration(self):
+        iter_pipe = IterPipe([1, 2, 3, 4]).map(lambda x: x * 10)
+        self.assertIsInstance(iter_pipe, collections.abc.Iterator)
+        self.assertFalse(hasattr(iter_pipe, "__dict__"))
+
+        # Iterating hands out the built chain, which shares its position with the pipeline
+        self.assertEqual(next(iter_pipe), 10)
+        for item in iter_pipe:
+            self.assertEqual(item, 20)
+            break
+        self.assertEqual(iter(iter_pipe).__next__(), 30)
+        self.assertEqual(list(iter_pipe), [40])
+
+    def test_nested_iterpipe(self):
+        inner = IterPipe([1, 2, 3]).map(lambda x: x * 2)
+        outer = IterPipe(inner).filter(lambda x: x > 2)
+        self.assertEqual([stage.name for stage in outer.stages], ["map", "filter"])
+        self.assertEqual(outer.list(), [4, 6])
+
     def test_accumulate(self):
         input_iterable = [1, 2, 3]
         output = list(IterPipe(input_iterable)
@@ -17,6 +70,37 @@ class test_Iterpipe(unittest.TestCase):
                       )
         self.assertEqual(output, [1, 3, 6])
 
+    def test_aggregate(self):
+        input_iterable = [3, 1, 4, 1, 5]
+        output_1 = (IterPipe(input_iterable)
+                    .aggregate(count=Count, total=Sum(), lo=Min, hi=Max(key=lambda x: -x))
+                    )
+        self.assertEqual(output_1, {"count": 5, "total": 14, "lo": 1, "hi": 1})
+
+        output_2 = (IterPipe([])
+                    .aggregate(total=Sum)
+                    )
+        self.assertEqual(output_2, {"total": 0})
+
+    def test_aggregate_by(self):
+        input_iterable = ["apple", "avocado", "banana", "blueberry", "cherry"]
+        key = lambda x: x[0]
+        output_1 = (IterPipe(input_iterable)
+                    .aggregate_by(key, list, lambda group, x: group + [x])
+                    .dict()
+                    )
+        self.assertEqual(output_1, {"a": ["apple", "avocado"],
+                                    "b": ["banana", "blueberry"],
+                                    "c": ["cherry"]})
+
+        # Spilling partial aggregates to disk gives the same result
+        input_iterable = [i % 100 for i in range(1000)]
+        output_2 = (IterPipe(input_iterable)
+                    .aggregate_by(None, int, lambda total, x: total + x, operator.add, max_keys=10)
+                    .dict()
+                    )
+        self.assertEqual(output_2, {i: i * 10 for i in range(100)})
+
     def test_all(self):
         input_iterable = [True, True]
         output = (IterPipe(input_iterable)
@@ -31,6 +115,67 @@ class test_Iterpipe(unittest.TestCase):
                   )
         self.assertTrue(output)
 
+    def test_batch(self):
+        input_iterable = [1, 2, 3, 4, 5]
+        output_1 = list(IterPipe(input_iterable)
+                        .batch(2)
+                        )
+        self.assertEqual(output_1, [[1, 2], [3, 4], [5]])
+
+        output_2 = list(IterPipe(input_iterable)
+                        .batch(2, container=tuple)
+                        )
+        self.assertEqual(output_2, [(1, 2), (3, 4), (5,)])
+
+        output_3 = list(IterPipe(input_iterable)
+                        .batch(10, timeout=0)
+                        )
+        self.assertEqual(output_3, [[1], [2], [3], [4], [5]])
+
+    def test_broadcast(self):
+        input_iterable = range(10000)
+        output = (IterPipe(input_iterable)
+                  .broadcast(lambda p: p.sum(),
+                             lambda p: p.filter(lambda x: x % 2 == 0).list(),
+                             lambda p: p.next(),
+                             max_buffer=16)
+                  )
+        self.assertEqual(output, (sum(input_iterable), list(range(0, 10000, 2)), 0))
+
+        iter_pipe = IterPipe(input_iterable)
+        with self.assertRaises(ZeroDivisionError):
+            iter_pipe.broadcast(lambda p: p.sum(), lambda p: p.map(lambda x: 1 / x).list())
+
+        # Branches are closed once their function returns, so a lazy pipeline returned over one cannot be read
+        total, doubled = IterPipe(input_iterable).broadcast(lambda p: p.sum(), lambda p: p.map(lambda x: x * 2))
+        self.assertEqual(total, sum(input_iterable))
+        with self.assertRaises(ValueError):
+            doubled.list()
+
+    def test_cached_map(self):
+        calls = []
+
+        def square(x):
+            calls.append(x)
+            return x * x
+
+        input_iterable = [1, 2, 1, 3, 1, 2]
+        output_1 = list(IterPipe(input_iterable)
+                        .cached_map(square)
+                        )
+        self.assertEqual(output_1, [1, 4, 1, 9, 1, 4])
+        self.assertEqual(calls, [1, 2, 3])
+
+        # Unhashable items with a key function, and a cache shared between pipelines
+        cache = Cache(maxsize=1)
+        input_iterable = [{"id": 1}, {"id": 1}, {"id": 2}]
+        for _ in range(2):
+            output_2 = list(IterPipe(input_iterable)
+                            .cached_map(lambda x: x["id"] * 10, key=lambda x: x["id"], cache=cache)
+                            )
+            self.assertEqual(output_2, [10, 10, 20])
+        self.assertEqual(cache.info(), (2, 4, 3, 1, 1))
+
     def test_chain(self):
         input_iterable = [1, 2, 3]
         output = list(IterPipe(input_iterable)
@@ -38,6 +183,50 @@ class test_Iterpipe(unittest.TestCase):
                       )
         self.assertEqual(output, [1, 2, 3, 4, 5, 6])
 
+    def test_checkpoint(self):
+        def build(source):
+            return (IterPipe(source)
+                    .dropwhile(lambda x: x < 2)
+                    .filter(lambda x: x % 3 != 0)
+                    .enumerate(start=1)
+                    .accumulate(lambda x, y: (y[0], x[1] + y[1]))
+                    .islice(1, None, 2)
+                    )
+
+        expected = build(range(40)).list()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = FileCheckpointStore(os.path.join(tmp_dir, "checkpoint"))
+            first_run = build(range(40)).checkpoint(store, every=3)
+            output = [first_run.next() for _ in range(7)]
+            # The run stops here. Only the first 6 items are known to be processed.
+            self.assertEqual(store.load()["emitted"], 6)
+
+            processed = []
+            second_run = build(iter(range(40))).checkpoint(store, every=3).resume()
+            for item in second_run:
+                processed.append(item)
+            self.assertEqual(output[:6] + processed, expected)
+            self.assertTrue(store.load()["done"])
+            self.assertEqual(build(range(40)).resume(store.load()).list(), [])
+
+        # Chaining onto a started pipeline continues from it without checkpointing it a second time
+        store = MemoryCheckpointStore()
+        first_run = build(range(40)).checkpoint(store, every=3)
+        for _ in range(7):
+            first_run.next()
+        snapshot = store.load()
+        resumed = build(range(40)).checkpoint(store, every=3).resume(snapshot)
+        first = resumed.next()
+        self.assertEqual([first] + resumed.map(lambda x: x).list(), expected[6:])
+        self.assertEqual(store.load()["stages"], snapshot["stages"])
+
+        store = MemoryCheckpointStore()
+        IterPipe(range(10)).map(str).checkpoint(store).list()
+        with self.assertRaises(ValueError):
+            IterPipe(range(10)).filter(None).resume(store.load()).list()
+        with self.assertRaises(ValueError):
+            IterPipe(range(10)).sorted().checkpoint(store).list()
+
     def test_combinations(self):
         input_iterable = [1, 2, 3]
         output = list(IterPipe(input_iterable)
@@ -59,6 +248,25 @@ class test_Iterpipe(unittest.TestCase):
                       )
         self.assertEqual(output, [1])
 
+    def test_count_distinct(self):
+        input_iterable = [i % 5000 for i in range(20000)]
+        output = (IterPipe(input_iterable)
+                  .count_distinct()
+                  )
+        self.assertAlmostEqual(output, 5000, delta=5000 * 0.05)
+
+        # Items whose hash() collides still count separately
+        self.assertEqual(IterPipe([-1, -2] * 10).count_distinct(), 2)
+        self.assertEqual(IterPipe([1, 1 + (2 ** 61 - 1), (-1,), (-2,)]).count_distinct(), 4)
+
+    def test_count_by(self):
+        input_iterable = [1, 2, 1, 3, 1]
+        output = (IterPipe(input_iterable)
+                  .count_by()
+                  .dict()
+                  )
+        self.assertEqual(output, {1: 3, 2: 1, 3: 1})
+
     def test_cycle(self):
         input_iterable = [1, 2, 3]
         iterator = (IterPipe(input_iterable)
@@ -79,6 +287,39 @@ class test_Iterpipe(unittest.TestCase):
                     )
         self.assertEqual(output_2, {"a": 1, "b": 2, "c": 3})
 
+    def test_distinct(self):
+        input_iterable = [3, 1, 3, 2, 1, 4, 3]
+        output_1 = list(IterPipe(input_iterable)
+                        .distinct()
+                        )
+        self.assertEqual(output_1, [3, 1, 2, 4])
+
+        output_2 = list(IterPipe(["a", "B", "A", "b"])
+                        .distinct(key=str.lower)
+                        )
+        self.assertEqual(output_2, ["a", "B"])
+
+        output_3 = list(IterPipe(input_iterable)
+                        .distinct(mode="window", capacity=2)
+                        )
+        self.assertEqual(output_3, [3, 1, 2, 1, 4, 3])
+
+        input_iterable = [i % 1000 for i in range(5000)]
+        output_4 = list(IterPipe(input_iterable)
+                        .distinct(mode="bloom", capacity=1000, error_rate=0.01)
+                        )
+        self.assertEqual(len(set(output_4)), len(output_4))
+        self.assertGreater(len(output_4), 950)
+
+        # Items whose hash() collides are not taken for duplicates
+        output_5 = list(IterPipe([-1, -2, -1])
+                        .distinct(mode="bloom", capacity=10)
+                        )
+        self.assertEqual(output_5, [-1, -2])
+
+        with self.assertRaises(ValueError):
+            IterPipe(input_iterable).distinct(mode="bloom").list()
+
     def test_dropwhile(self):
         input_iterable = [1, 2, 3]
         predicate = lambda x: x <= 2
@@ -94,6 +335,31 @@ class test_Iterpipe(unittest.TestCase):
                       )
         self.assertEqual(output, [(0, 1), (1, 2), (2, 3)])
 
+    def test_explain(self):
+        def square(x):
+            return x * x
+
+        output = (IterPipe(range(10))
+                  .map(square)
+                  .islice(3)
+                  .explain()
+                  )
+        self.assertEqual(output, "plan:\n  source: range\n  islice(3)\n  map(square)\nrewrites:\n  islice before map")
+
+    def test_external_sorted(self):
+        input_iterable = [5, 3, 9, 1, 7, 2, 8]
+        output_1 = list(IterPipe(input_iterable)
+                        .external_sorted(max_memory_items=2)
+                        )
+        self.assertEqual(output_1, [1, 2, 3, 5, 7, 8, 9])
+
+        input_iterable = [(3, "c"), (1, "a"), (2, "b"), (1, "z")]
+        key = lambda x: x[0]
+        output_2 = list(IterPipe(input_iterable)
+                        .external_sorted(key=key, reverse=True, max_memory_items=3)
+                        )
+        self.assertEqual(output_2, sorted(input_iterable, key=key, reverse=True))
+
     def test_filterfalse(self):
         input_iterable = [1, 2, 3]
         predicate = lambda x: x == 2
@@ -102,6 +368,48 @@ class test_Iterpipe(unittest.TestCase):
                       )
         self.assertEqual(output, [1, 3])
 
+    def test_from_lines(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "lines.txt")
+            with open(path, "wb") as file:
+                file.write("a\nb\u00e9\n\nc".encode("utf-8"))
+            output_1 = list(IterPipe.from_lines(path))
+            self.assertEqual(output_1, ["a", "b\u00e9", "", "c"])
+
+            output_2 = list(IterPipe.from_lines(path, encoding=None))
+            self.assertEqual(output_2, [b"a", "b\u00e9".encode("utf-8"), b"", b"c"])
+
+            with open(path, "wb") as file:
+                file.write(b"a\r\nb\r\n\r\nc\rd\n\xff\n")
+            lines = IterPipe.from_lines(path)
+            self.assertEqual(lines.islice(4).list(), ["a", "b", "", "c\rd"])
+            with self.assertRaises(UnicodeDecodeError):
+                lines.next()
+            output_3 = list(IterPipe.from_lines(path, encoding=None))
+            self.assertEqual(output_3, [b"a", b"b", b"", b"c\rd", b"\xff"])
+
+    def test_from_mmap(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "records.txt")
+            with open(path, "wb") as file:
+                file.write(b"a;bc;;d;")
+            output = (IterPipe.from_mmap(path, sep=b";")
+                      .map(bytes)
+                      .list()
+                      )
+            self.assertEqual(output, [b"a", b"bc", b"", b"d"])
+
+            with self.assertRaises(ValueError):
+                IterPipe.from_mmap(path, sep=b"")
+
+    def test_from_records(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "records.bin")
+            with open(path, "wb") as file:
+                file.write(struct.pack("<ihih", 1, 2, 3, 4))
+            output = list(IterPipe.from_records(path, "<ih"))
+            self.assertEqual(output, [(1, 2), (3, 4)])
+
     def test_frozenset(self):
         input_iterable = [1, 2, 3]
         output = (IterPipe(input_iterable)
@@ -127,6 +435,28 @@ class test_Iterpipe(unittest.TestCase):
         self.assertEqual(output, [(1, [(1, "a"), (1, "b")]),
                                   (2, [(2, "c"), (2, "d")])])
 
+    def test_instrument(self):
+        reports = []
+        input_iterable = range(10)
+        iter_pipe = (IterPipe(input_iterable)
+                     .instrument(reports.append)
+                     .filter(lambda x: x % 2 == 0)
+                     .map(lambda x: x * 2)
+                     )
+        output = iter_pipe.list()
+        self.assertEqual(output, [0, 4, 8, 12, 16])
+
+        report = iter_pipe.report()
+        self.assertEqual(reports, [report])
+        self.assertEqual([stage.name for stage in report], ["source", "filter", "map"])
+        self.assertEqual([(stage.items_in, stage.items_out) for stage in report],
+                         [(None, 10), (10, 5), (5, 5)])
+        self.assertEqual(report[1].selectivity, 0.5)
+        self.assertAlmostEqual(report[2].upstream_time, report[1].wall_time + report[0].wall_time)
+
+        with self.assertRaises(ValueError):
+            IterPipe(input_iterable).report()
+
     def test_islice(self):
         input_iterable = [1, 2, 3, 4]
         output = list(IterPipe(input_iterable)
@@ -134,6 +464,28 @@ class test_Iterpipe(unittest.TestCase):
                       )
         self.assertEqual(output, [2, 3])
 
+    def test_join(self):
+        left = [(1, "a"), (2, "b"), (2, "c"), (4, "d")]
+        right = [(2, "x"), (3, "y"), (1, "z"), (2, "w")]
+        key = lambda x: x[0]
+        output_1 = list(IterPipe(left)
+                        .join(right, key)
+                        )
+        self.assertEqual(output_1, [((1, "a"), (1, "z")),
+                                    ((2, "b"), (2, "x")), ((2, "b"), (2, "w")),
+                                    ((2, "c"), (2, "x")), ((2, "c"), (2, "w"))])
+
+        output_2 = list(IterPipe(left)
+                        .join(right, key, how="outer", build="left")
+                        )
+        self.assertEqual(sorted(output_2, key=repr), sorted(output_1 + [((4, "d"), None), (None, (3, "y"))], key=repr))
+
+        # Spilling to disk gives the same pairs
+        output_3 = list(IterPipe(left)
+                        .join(right, key, how="left", max_memory_items=1)
+                        )
+        self.assertEqual(sorted(output_3), sorted(output_1 + [((4, "d"), None)]))
+
     def test_list(self):
         input_iterable = [1, 2, 3]
         output = (IterPipe(input_iterable)
@@ -149,6 +501,33 @@ class test_Iterpipe(unittest.TestCase):
                       )
         self.assertEqual(output, [2, 4, 6])
 
+    def test_map_batches(self):
+        input_iterable = [1, 2, 3, 4, 5]
+        calls = []
+
+        def double_all(batch):
+            calls.append(len(batch))
+            return [x * 2 for x in batch]
+
+        output = list(IterPipe(input_iterable)
+                      .map_batches(double_all, 2)
+                      )
+        self.assertEqual(output, [2, 4, 6, 8, 10])
+        self.assertEqual(calls, [2, 2, 1])
+
+    def test_merge_join(self):
+        left = [1, 2, 2, 4]
+        right = [2, 2, 3, 4, 5]
+        output_1 = list(IterPipe(left)
+                        .merge_join(right)
+                        )
+        self.assertEqual(output_1, [(2, 2), (2, 2), (2, 2), (2, 2), (4, 4)])
+
+        output_2 = list(IterPipe(left)
+                        .merge_join(right, how="outer")
+                        )
+        self.assertEqual(output_2, [(1, None), (2, 2), (2, 2), (2, 2), (2, 2), (None, 3), (4, 4), (None, 5)])
+
     def test_max(self):
         input_iterable = [1, 2, 3]
         output_1 = (IterPipe(input_iterable)
@@ -177,6 +556,13 @@ class test_Iterpipe(unittest.TestCase):
                     )
         self.assertEqual(output_2, (1, "a"))
 
+    def test_nlargest(self):
+        input_iterable = [5, 3, 9, 1]
+        output = (IterPipe(input_iterable)
+                  .nlargest(2)
+                  )
+        self.assertEqual(output, [9, 5])
+
     def test_next(self):
         input_iterable = [1, 2, 3]
         iter_pipe = (IterPipe(input_iterable))
@@ -185,6 +571,119 @@ class test_Iterpipe(unittest.TestCase):
         output_2 = iter_pipe.next()
         self.assertEqual(output_2, 2)
 
+    def test_nsmallest(self):
+        input_iterable = [5, 3, 9, 1]
+        output = (IterPipe(input_iterable)
+                  .nsmallest(2)
+                  )
+        self.assertEqual(output, [1, 3])
+
+    def test_optimize(self):
+        calls = []
+
+        def expensive(x):
+            calls.append(x)
+            return x * 10
+
+        input_iterable = list(range(100))
+        iter_pipe = (IterPipe(input_iterable)
+                     .map(expensive)
+                     .filter(commuting(lambda x: x % 3 == 0))
+                     .islice(1, 4)
+                     )
+        output_1 = iter_pipe.optimize().list()
+        self.assertEqual(output_1, [30, 60, 90])
+        # Only the items kept by the filter and the slice are mapped
+        self.assertEqual(calls, [3, 6, 9])
+        self.assertEqual(output_1, iter_pipe.list())
+
+        def build():
+            return (IterPipe(input_iterable)
+                    .map(operator.neg)
+                    .sorted(key=lambda x: x % 7)
+                    .filter(lambda x: x % 2 == 0)
+                    .enumerate(start=1)
+                    .islice(2, 6)
+                    )
+
+        optimized = build().optimize()
+        self.assertEqual([stage.name for stage in optimized.stages], ["map", "filter", "top_k", "islice", "enumerate"])
+        self.assertEqual(optimized.list(), build().list())
+
+    def test_par_filter(self):
+        input_iterable = range(100)
+        output = list(IterPipe(input_iterable)
+                      .par_filter(lambda x: x % 3 == 0, workers=4, chunksize=7, executor="thread")
+                      )
+        self.assertEqual(output, list(range(0, 100, 3)))
+
+    def test_par_map(self):
+        input_iterable = range(100)
+        output_1 = list(IterPipe(input_iterable)
+                        .par_map(operator.neg, workers=2, chunksize=10)
+                        )
+        self.assertEqual(output_1, [-x for x in input_iterable])
+
+        output_2 = (IterPipe(input_iterable)
+                    .par_map(lambda x: x * 2, workers=4, chunksize=3, ordered=False, executor="thread")
+                    .list()
+                    )
+        self.assertEqual(sorted(output_2), [x * 2 for x in input_iterable])
+
+        # Unbounded sources are consumed only as far as needed
+        output_3 = (IterPipe(itertools.count())
+                    .par_map(lambda x: x + 1, workers=2, chunksize=5, executor="thread")
+                    .islice(3)
+                    .list()
+                    )
+        self.assertEqual(output_3, [1, 2, 3])
+
+        iter_pipe = IterPipe([1, 0]).par_map(lambda x: 1 / x, workers=1, executor="thread")
+        with self.assertRaises(ZeroDivisionError):
+            iter_pipe.list()
+
+        # Chunks of bytes go through shared memory, others are pickled
+        input_iterable = list(range(100)) + [b"ab", b"c"] * 50 + ["x"] * 10
+        output_4 = list(IterPipe(input_iterable)
+                        .par_map(functools.partial(operator.mul, 2), workers=2, chunksize=20,
+                                 transport="shared_memory")
+                        )
+        self.assertEqual(output_4, [x * 2 for x in input_iterable])
+
+    def test_par_starmap(self):
+        input_iterable = [(1, 1), (2, 2)]
+        output = list(IterPipe(input_iterable)
+                      .par_starmap(operator.add, workers=2, chunksize=1)
+                      )
+        self.assertEqual(output, [2, 4])
+
+    def test_partition_by(self):
+        input_iterable = ["a", "b", "c", "a", "d", "b", "a"] * 100
+        output_1 = (IterPipe(input_iterable)
+                    .partition_by(n=3)
+                    .count_by()
+                    .gather()
+                    .dict()
+                    )
+        self.assertEqual(output_1, {"a": 300, "b": 200, "c": 100, "d": 100})
+
+        # Ordered output is partition by partition, in input order within each
+        output_2 = (IterPipe(range(10))
+                    .map(lambda x: x + 1)
+                    .partition_by(lambda x: x % 2, 2)
+                    .map(functools.partial(operator.mul, 10))
+                    .gather(ordered=True)
+                    .list()
+                    )
+        self.assertEqual(output_2, [20, 40, 60, 80, 100, 10, 30, 50, 70, 90])
+
+        iter_pipe = IterPipe([1, 0, 2]).partition_by(n=2).map(functools.partial(operator.truediv, 1)).gather()
+        with self.assertRaises(ZeroDivisionError):
+            iter_pipe.list()
+
+        with self.assertRaises(ValueError):
+            IterPipe([1]).map(abs).gather()
+
     def test_permutations(self):
         input_iterable = [1, 2, 3]
         output = list(IterPipe(input_iterable)
@@ -192,6 +691,24 @@ class test_Iterpipe(unittest.TestCase):
                       )
         self.assertEqual(output, [(1, 2), (1, 3), (2, 1), (2, 3), (3, 1), (3, 2)])
 
+    def test_prefetch(self):
+        input_iterable = range(1000)
+        output_1 = list(IterPipe(input_iterable)
+                        .map(lambda x: x * 2)
+                        .prefetch(8)
+                        )
+        self.assertEqual(output_1, [x * 2 for x in input_iterable])
+
+        # Upstream errors reach the consumer after the items before them
+        iter_pipe = (IterPipe([1, 2, 0])
+                     .map(lambda x: 1 / x)
+                     .prefetch(1)
+                     )
+        self.assertEqual(iter_pipe.next(), 1)
+        self.assertEqual(iter_pipe.next(), 0.5)
+        with self.assertRaises(ZeroDivisionError):
+            iter_pipe.next()
+
     def test_product(self):
         input_iterable = [1, 2]
         output = list(IterPipe(input_iterable)
@@ -199,12 +716,45 @@ class test_Iterpipe(unittest.TestCase):
                       )
         self.assertEqual(output, [(1, 3), (1, 4), (2, 3), (2, 4)])
 
+    def test_rolling(self):
+        input_iterable = [3, 1, 4, 1, 5, 9, 2, 6]
+        windows = [input_iterable[i:i + 3] for i in range(len(input_iterable) - 2)]
+        self.assertEqual(IterPipe(input_iterable).rolling_sum(3).list(), [sum(w) for w in windows])
+        self.assertEqual(IterPipe(input_iterable).rolling_mean(3).list(), [sum(w) / 3 for w in windows])
+        self.assertEqual(IterPipe(input_iterable).rolling_min(3).list(), [min(w) for w in windows])
+        self.assertEqual(IterPipe(input_iterable).rolling_max(3).list(), [max(w) for w in windows])
+        self.assertEqual(IterPipe([1, 2]).rolling_max(3).list(), [])
+
+    def test_session(self):
+        input_iterable = [(1, "a"), (2, "b"), (10, "c"), (11, "d"), (30, "e")]
+        output = list(IterPipe(input_iterable)
+                      .session(5, key=lambda x: x[0])
+                      )
+        self.assertEqual(output, [[(1, "a"), (2, "b")], [(10, "c"), (11, "d")], [(30, "e")]])
+
     def test_set(self):
         input_iterable = [1, 2, 1]
         output = (IterPipe(input_iterable)
                   .set())
         self.assertEqual(output, {1, 2})
 
+    def test_sliding(self):
+        input_iterable = [1, 2, 3, 4, 5]
+        output_1 = list(IterPipe(input_iterable)
+                        .sliding(3)
+                        )
+        self.assertEqual(output_1, [(1, 2, 3), (2, 3, 4), (3, 4, 5)])
+
+        output_2 = list(IterPipe(input_iterable)
+                        .sliding(2, step=2)
+                        )
+        self.assertEqual(output_2, [(1, 2), (3, 4)])
+
+        output_3 = list(IterPipe(input_iterable)
+                        .sliding(1, step=3)
+                        )
+        self.assertEqual(output_3, [(1,), (4,)])
+
     def test_sorted(self):
         input_iterable_1 = [3, 2, 1]
         output_1 = list(IterPipe(input_iterable_1)
@@ -227,6 +777,15 @@ class test_Iterpipe(unittest.TestCase):
                       )
         self.assertEqual(output, [2, 4])
 
+    def test_stats(self):
+        input_iterable = [2, 4, 4, 4, 5, 5, 7, 9]
+        output = (IterPipe(input_iterable)
+                  .stats()
+                  )
+        self.assertEqual(output[:5], (8, 40, 2, 9, 5.0))
+        self.assertAlmostEqual(output.variance, 32 / 7)
+        self.assertAlmostEqual(output.stdev, (32 / 7) ** 0.5)
+
     def test_sum(self):
         input_iterable = [1, 2, 3]
         output = (IterPipe(input_iterable)
@@ -234,6 +793,14 @@ class test_Iterpipe(unittest.TestCase):
                   )
         self.assertEqual(output, 6)
 
+    def test_sum_by(self):
+        input_iterable = [("a", 1), ("b", 2), ("a", 3)]
+        output = (IterPipe(input_iterable)
+                  .sum_by(lambda x: x[0], lambda x: x[1], max_keys=1)
+                  .dict()
+                  )
+        self.assertEqual(output, {"a": 4, "b": 2})
+
     def test_takewhile(self):
         input_iterable = [1, 2, 3]
         predicate = lambda x: x <= 2
@@ -242,6 +809,39 @@ class test_Iterpipe(unittest.TestCase):
                       )
         self.assertEqual(output, [1, 2])
 
+    def test_template(self):
+        total = (IterPipe.template()
+                 .filter(lambda x: x % 2 == 1)
+                 .map(lambda x: x * 10)
+                 .islice(2)
+                 .sum()
+                 )
+        self.assertEqual(total([1, 2, 3, 4, 5]), 40)
+        self.assertEqual(total(iter([7])), 70)
+        self.assertEqual(total.map_over([[1, 3, 5], [], range(4)]).list(), [40, 0, 40])
+
+        # Without a terminal, calling the template returns a pipeline
+        doubled = IterPipe.template().map(lambda x: x * 2)
+        self.assertEqual([stage.name for stage in doubled.stages], ["map"])
+        self.assertEqual(doubled([1, 2]).list(), [2, 4])
+        self.assertEqual(doubled.list()([3]), [6])
+
+        with self.assertRaises(TypeError):
+            total.map(abs)
+
+        # Stateful terminal arguments start afresh on each run
+        summary = IterPipe.template().aggregate(total=Sum(), n=Count())
+        self.assertEqual(summary([1, 2]), {"total": 3, "n": 2})
+        self.assertEqual(summary([1, 2]), {"total": 3, "n": 2})
+        self.assertEqual(summary([]), {"total": 0, "n": 0})
+
+        # Other arguments are passed as they are
+        seen = []
+        collect = IterPipe.template().reduce(lambda items, item: items + [item], seen)
+        self.assertEqual(collect([1, 2]), [1, 2])
+        self.assertEqual(collect([3]), [3])
+        self.assertEqual(seen, [])
+
     def test_tee(self):
         input_iterable = [1, 2, 3]
         (iter_pipe_1, iter_pipe_2) = (IterPipe(input_iterable)
@@ -252,6 +852,49 @@ class test_Iterpipe(unittest.TestCase):
         output_2 = list(iter_pipe_2)
         self.assertEqual(output_2, input_iterable)
 
+        (iter_pipe_1, iter_pipe_2) = (IterPipe(input_iterable)
+                                      .tee(2, max_buffer=2)
+                                      )
+        self.assertIsInstance(iter_pipe_1, IterPipe)
+        self.assertEqual(iter_pipe_1.islice(2).list(), [1, 2])
+        with self.assertRaises(BufferError):
+            iter_pipe_1.next()
+        self.assertEqual(iter_pipe_2.list(), input_iterable)
+        self.assertEqual(iter_pipe_1.list(), [3])
+
+    def test_throttle(self):
+        input_iterable = range(6)
+        start = time.monotonic()
+        output = list(IterPipe(input_iterable)
+                      .throttle(50, burst=2)
+                      )
+        elapsed = time.monotonic() - start
+        self.assertEqual(output, list(input_iterable))
+        # 2 items pass at once, the other 4 wait 1 / 50 s each
+        self.assertGreaterEqual(elapsed, 0.075)
+
+    def test_to_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "output.txt")
+            count = (IterPipe(["a", b"b", "c"])
+                     .to_file(path, buffer_size=2)
+                     )
+            self.assertEqual(count, 3)
+            self.assertEqual(IterPipe.from_lines(path).list(), ["a", "b", "c"])
+
+    def test_top_k(self):
+        input_iterable = [(3, "c"), (1, "a"), (2, "b")]
+        key = lambda x: x[0]
+        output_1 = (IterPipe(input_iterable)
+                    .top_k(2, key=key)
+                    )
+        self.assertEqual(output_1, [(1, "a"), (2, "b")])
+
+        output_2 = (IterPipe(input_iterable)
+                    .top_k(1, key=key, reverse=True)
+                    )
+        self.assertEqual(output_2, [(3, "c")])
+
     def test_tuple(self):
         input_iterable = [1, 2, 3]
         output = (IterPipe(input_iterable)
@@ -259,6 +902,131 @@ class test_Iterpipe(unittest.TestCase):
                   )
         self.assertEqual(output, (1, 2, 3))
 
+    def test_tumbling(self):
+        input_iterable = [1, 2, 3, 4, 5]
+        output = list(IterPipe(input_iterable)
+                      .tumbling(2)
+                      )
+        self.assertEqual(output, [(1, 2), (3, 4), (5,)])
+
+    def test_unbatch(self):
+        input_iterable = [[1, 2], (3,), []]
+        output = list(IterPipe(input_iterable)
+                      .unbatch()
+                      )
+        self.assertEqual(output, [1, 2, 3])
+
+    def test_vectorized(self):
+        # Runs vectorized when NumPy is installed and element-wise otherwise, with the same results
+        output_1 = (IterPipe(range(1000))
+                    .vectorized(block_size=64)
+                    .filter(lambda x: x >= 6)
+                    .map(lambda x: x * x)
+                    .sum()
+                    )
+        self.assertEqual(output_1, sum(x * x for x in range(6, 1000)))
+
+        output_2 = (IterPipe(array.array("i", [3, 1, 2, 5]))
+                    .vectorized(block_size=2)
+                    .accumulate()
+                    .list()
+                    )
+        self.assertEqual(output_2, [3, 4, 6, 11])
+
+        # Functions that do not accept arrays fall back to element-wise calls
+        output_3 = (IterPipe(range(10))
+                    .vectorized(block_size=4)
+                    .map(lambda x: x if x > 4 else 0)
+                    .filterfalse(lambda x: x == 0)
+                    .max()
+                    )
+        self.assertEqual(output_3, 9)
+
+        output_4 = (IterPipe(range(10))
+                    .vectorized()
+                    .filter(lambda x: x > 100)
+                    .min(default=None)
+                    )
+        self.assertIsNone(output_4)
+
+        # Stages that cannot be vectorized run element-wise on the unboxed items
+        output_5 = (IterPipe(range(10))
+                    .vectorized()
+                    .map(lambda x: x * 2)
+                    .islice(3)
+                    .list()
+                    )
+        self.assertEqual(output_5, [0, 2, 4])
+
+        # Results are those of element-wise calls, whatever their type
+        output_6 = (IterPipe(range(4))
+                    .vectorized()
+                    .map(lambda x: (x, x * x))
+                    .list()
+                    )
+        self.assertEqual(output_6, [(0, 0), (1, 1), (2, 4), (3, 9)])
+
+        output_7 = (IterPipe(range(4))
+                    .vectorized()
+                    .map(lambda x: [0] * x)
+                    .list()
+                    )
+        self.assertEqual(output_7, [[], [0], [0, 0], [0, 0, 0]])
+
+        output_8 = (IterPipe(range(4))
+                    .vectorized(block_size=2)
+                    .map(lambda x: x / 2 if x % 2 else x)
+                    .accumulate()
+                    .list()
+                    )
+        self.assertEqual(output_8, [0, 0.5, 2.5, 4.0])
+        self.assertEqual([type(item) for item in output_8], [int, float, float, float])
+
+    def test_vectorized_overflow(self):
+        # Results match Python ints where NumPy integers would wrap around
+        source = range(10 ** 15, 10 ** 15 + 100000)
+        self.assertEqual(IterPipe(source).vectorized().sum(), sum(source))
+        self.assertEqual(IterPipe(source).vectorized(block_size=1000).accumulate().list(),
+                         list(itertools.accumulate(source)))
+        self.assertEqual(IterPipe(range(1, 60)).vectorized(block_size=8).accumulate(operator.mul).list(),
+                         list(itertools.accumulate(range(1, 60), operator.mul)))
+
+        source = range(2 ** 63, 2 ** 63 + 10)
+        self.assertEqual(IterPipe(source).vectorized().sum(), sum(source))
+
+        # Mappings and predicates that only overflow late in a block
+        source = range(0, 4 * 10 ** 9, 10 ** 6)
+        self.assertEqual(IterPipe(source).vectorized().map(lambda x: x * x).list(), [x * x for x in source])
+        self.assertEqual(IterPipe(source).vectorized().filter(lambda x: x * x * x > 10 ** 27).list(),
+                         [x for x in source if x * x * x > 10 ** 27])
+        self.assertEqual(IterPipe(array.array("B", [200, 100, 50])).vectorized().accumulate().list(), [200, 300, 350])
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_vectorized_numpy_source(self):
+        source = numpy.arange(10, dtype=numpy.int64)
+        output = (IterPipe(source)
+                  .vectorized(block_size=3)
+                  .map(numpy.negative)
+                  .accumulate(min)
+                  .list()
+                  )
+        self.assertEqual(output, [-x for x in range(10)])
+
+        # A stage that stops vectorizing after the first block runs element-wise from there on
+        def double(x):
+            if isinstance(x, numpy.ndarray) and x.max() >= 3:
+                raise TypeError("too big")
+            return x * 2
+
+        output_2 = (IterPipe(source)
+                    .vectorized(block_size=3)
+                    .map(double)
+                    .accumulate()
+                    .filter(lambda x: x % 4 == 0)
+                    .list()
+                    )
+        self.assertEqual(output_2, [0, 12, 20, 56, 72])
+
     def test_zip(self):
         input_iterable = [1, 2, 3]
         output = list(IterPipe(input_iterable)
@@ -279,6 +1047,21 @@ class test_Iterpipe(unittest.TestCase):
                         )
         self.assertEqual(output_1, [(1, 4), (2, 5), (3, 99)])
 
+    def test_quantiles(self):
+        input_iterable = list(range(1, 101))
+        output_1 = (IterPipe(input_iterable)
+                    .quantiles(0, 0.5, 1)
+                    )
+        self.assertEqual(output_1, (1, 50, 100))
+
+        input_iterable = range(100000)
+        low, median, high = (IterPipe(input_iterable)
+                             .quantiles(0.01, 0.5, 0.99, seed=1)
+                             )
+        self.assertAlmostEqual(low, 1000, delta=2000)
+        self.assertAlmostEqual(median, 50000, delta=2000)
+        self.assertAlmostEqual(high, 99000, delta=2000)
+
     def test_reduce(self):
         input_iterable = [1, 2, 3, 4]
 
@@ -0,0 +1,42 @@
+import unittest
+
+from IterPipe import Cache
+
+
+class test_Cache(unittest.TestCase):
+    def test_lru(self):
+        cache = Cache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.info(), (2, 1, 1, 2, 2))
+
+    def test_lfu(self):
+        cache = Cache(maxsize=2, policy="lfu")
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.get("a")
+        cache.get("b")
+        cache.put("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_ttl(self):
+        now = [0.0]
+        cache = Cache(ttl=10, timer=lambda: now[0])
+        cache.put("a", 1)
+        now[0] = 5.0
+        self.assertEqual(cache.get("a"), 1)
+        now[0] = 10.0
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.info().evictions, 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            Cache(policy="fifo")
@@ -0,0 +1,72 @@
+import os
+import re
+import subprocess
+import sys
+import unittest
+
+from IterPipe import IterPipe, register
+
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that importing IterPipe must leave to the stage families that need them.
+HEAVY_MODULES = ["asyncio", "concurrent.futures", "multiprocessing", "numpy", "pickle", "tempfile", "threading"]
+
+# Cumulative import time budget for the IterPipe package, in microseconds. Importing the optional backends eagerly
+# took more than 150 ms.
+IMPORT_TIME_BUDGET = 100000
+
+
+def _python(code, *options):
+    env = dict(os.environ, PYTHONPATH=PACKAGE_DIR)
+    return subprocess.run([sys.executable] + list(options) + ["-c", code], env=env, capture_output=True, text=True,
+                          check=True)
+
+
+def double(iterator, factor=2):
+    return (item * factor for item in iterator)
+
+
+class test_plugins(unittest.TestCase):
+    def tearDown(self):
+        for name in ("plugin_double", "plugin_scaled", "plugin_count"):
+            if name in vars(IterPipe):
+                delattr(IterPipe, name)
+
+    def test_register_stage(self):
+        register("plugin_double", double)
+        output = (IterPipe([1, 2, 3])
+                  .plugin_double(factor=10)
+                  .map(str)
+                  .list()
+                  )
+        self.assertEqual(output, ["10", "20", "30"])
+
+        # Targets given by name are imported on first use
+        register("plugin_scaled", __name__ + ":double")
+        iter_pipe = IterPipe([1, 2]).plugin_scaled(3)
+        self.assertEqual([stage.name for stage in iter_pipe.stages], ["plugin_scaled"])
+        self.assertEqual(iter_pipe.list(), [3, 6])
+
+    def test_register_method(self):
+        register("plugin_count", lambda pipe: sum(1 for _ in pipe), kind="method")
+        self.assertEqual(IterPipe(range(5)).filter(None).plugin_count(), 4)
+
+        with self.assertRaises(ValueError):
+            register("map", double)
+        with self.assertRaises(AttributeError):
+            IterPipe([]).plugin_missing()
+
+    def test_lazy_imports(self):
+        code = "import sys, IterPipe; print(' '.join(sorted(sys.modules)))"
+        modules = set(_python(code).stdout.split())
+        self.assertEqual([name for name in HEAVY_MODULES if name in modules], [])
+
+        code = "import sys, IterPipe; IterPipe.IterPipe(range(4)).par_map(abs, workers=1).list(); print(*sys.modules)"
+        self.assertIn("concurrent.futures", _python(code).stdout.split())
+
+    def test_import_time(self):
+        stderr = _python("import IterPipe", "-X", "importtime").stderr
+        cumulative = [int(match.group(1)) for match in re.finditer(r"\|\s*(\d+) \| IterPipe$", stderr, re.MULTILINE)]
+        self.assertEqual(len(cumulative), 1, stderr)
+        self.assertLess(cumulative[0], IMPORT_TIME_BUDGET)
@@ -0,0 +1,81 @@
+from array import array
+import multiprocessing
+import os
+import subprocess
+import sys
+import unittest
+
+from IterPipe import transport
+from IterPipe.parallel import map_chunk
+from IterPipe.vectorized import numpy
+
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs par_map over shared memory with the start method given as argument. The first chunk is pickled, so the workers
+# start before the first block is created, and blocks are reused over several chunks.
+PAR_MAP_CODE = """
+import functools, multiprocessing, operator, sys
+from IterPipe import IterPipe
+multiprocessing.set_start_method(sys.argv[1])
+items = list(range(64)) + [b"ab" * i for i in range(2000)]
+double = functools.partial(operator.mul, 2)
+output = IterPipe(items).par_map(double, workers=2, chunksize=64, transport="shared_memory").list()
+assert output == [item * 2 for item in items]
+"""
+
+
+class test_transport(unittest.TestCase):
+    def roundtrip(self, items):
+        kind, layout, size, write = transport.encode(items)
+        buffer = memoryview(bytearray(size))
+        write(buffer)
+        return transport.decode(buffer, kind, layout)
+
+    def test_roundtrip(self):
+        for items in ([b"", b"ab", b"c" * 1000], [array("i", [1, 2]), array("i")], [array("d", [0.5])]):
+            self.assertEqual(self.roundtrip(items), items)
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_roundtrip_ndarray(self):
+        items = [numpy.arange(6).reshape(2, 3), numpy.ones((2, 3), dtype=int)]
+        output = self.roundtrip(items)
+        self.assertEqual([item.tolist() for item in output], [item.tolist() for item in items])
+
+        # Fields of structured dtypes are kept
+        record = numpy.dtype([("a", "i4"), ("b", "f4")])
+        items = [numpy.array([(1, 0.5), (2, 1.5)], dtype=record), numpy.zeros(2, dtype=record)]
+        output = self.roundtrip(items)
+        self.assertEqual([item.dtype for item in output], [record, record])
+        self.assertEqual([item.tolist() for item in output], [item.tolist() for item in items])
+
+    def test_unsupported(self):
+        self.assertIsNone(transport.encode([]))
+        self.assertIsNone(transport.encode([b"a", bytearray(b"b")]))
+        self.assertIsNone(transport.encode([1, 2]))
+        self.assertIsNone(transport.encode([array("i"), array("d")]))
+
+    def test_blocks(self):
+        blocks = transport.Blocks()
+        try:
+            # Results that cannot be written back are pickled
+            block, arguments = blocks.send([b"a", b"bc"])
+            reply = transport.run_chunk(map_chunk, len, *arguments)
+            self.assertEqual(blocks.receive(block, reply), [1, 2])
+
+            # Free blocks are reused
+            block_2, arguments = blocks.send([b"ab"])
+            self.assertIs(block_2, block)
+            reply = transport.run_chunk(map_chunk, bytes.upper, *arguments)
+            self.assertEqual(blocks.receive(block_2, reply), [b"AB"])
+            self.assertIsNone(blocks.send(["a"]))
+        finally:
+            blocks.close()
+
+    def test_resource_tracker(self):
+        # Workers must not leave registrations behind that make the resource tracker warn at shutdown
+        env = dict(os.environ, PYTHONPATH=PACKAGE_DIR)
+        for method in set(multiprocessing.get_all_start_methods()) & {"fork", "spawn"}:
+            result = subprocess.run([sys.executable, "-c", PAR_MAP_CODE, method], env=env, capture_output=True,
+                                    text=True, check=True)
+            self.assertEqual(result.stderr, "")